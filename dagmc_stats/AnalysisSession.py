@@ -0,0 +1,183 @@
+import numpy as np
+from pymoab import types
+
+try:
+    from . import dagmc_stats
+    from .DagmcFile import get_surface_tris
+    from .TriangleMesh import TriangleMesh
+except ImportError:
+    # imported as a top level module by generate_stats.py
+    import dagmc_stats
+    from DagmcFile import get_surface_tris
+    from TriangleMesh import TriangleMesh
+
+
+class AnalysisSession:
+
+    def __init__(self, my_core, root_set=None, threads=1):
+        """Constructor
+
+        The state shared by all the statistics of one file. The tags and
+        entity ranges are read once, and the triangle meshes (with their
+        cached side lengths, angles, areas and cotangent weights) are built
+        the first time a statistic needs them and then reused by every other
+        statistic.
+
+        inputs
+        ------
+        my_core : a MOAB Core instance with the file loaded
+        root_set : (optional) the root set for the file. By default the root
+                   set of my_core is used.
+        threads : (optional) number of threads that the kernels of the
+                  meshes use (see TriangleMesh)
+
+        outputs
+        -------
+        none
+        """
+        self.my_core = my_core
+        if root_set is None:
+            root_set = my_core.get_root_set()
+        self.root_set = root_set
+        self.threads = threads
+        self.dagmc_tags = dagmc_stats.get_dagmc_tags(my_core)
+        entity_types = [types.MBVERTEX, types.MBTRI, types.MBENTITYSET]
+        self.native_ranges = dagmc_stats.get_native_ranges(my_core, root_set,
+                                                           entity_types)
+        self.entityset_ranges = dagmc_stats.get_entityset_ranges(
+            my_core, root_set, self.dagmc_tags['geom_dim'])
+        self._meshes = {}
+
+    def get_model_mesh(self):
+        """Get the mesh of all the surface triangles of the model, with one
+        segment per surface in the order of entityset_ranges['Surfaces']
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        mesh : TriangleMesh instance
+        """
+        if self.root_set not in self._meshes:
+            tris, surf_offsets = get_surface_tris(
+                self.my_core, self.entityset_ranges['Surfaces'])
+            self._meshes[self.root_set] = TriangleMesh.from_moab(
+                self.my_core, tris, surf_offsets=surf_offsets,
+                threads=self.threads)
+        return self._meshes[self.root_set]
+
+    def get_mesh(self, meshset=None):
+        """Get the mesh of the triangles of a meshset (see dagmc_stats.get_tris)
+
+        inputs
+        ------
+        meshset : (optional) a volume, a surface or the root set. By default
+                  the mesh of the whole model is returned.
+
+        outputs
+        -------
+        mesh : TriangleMesh instance
+        """
+        if meshset is None or meshset == self.root_set:
+            return self.get_model_mesh()
+        if meshset not in self._meshes:
+            tris = dagmc_stats.get_tris(self.my_core, meshset,
+                                        self.dagmc_tags['geom_dim'])
+            self._meshes[meshset] = TriangleMesh.from_moab(
+                self.my_core, tris, threads=self.threads)
+        return self._meshes[meshset]
+
+    def get_triangles_per_surface(self):
+        """Get the number of triangles on each surface
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        t_p_s : a dictionary in the form of {surface entityhandle : triangles
+                it contains}
+        """
+        t_p_s = self.get_model_mesh().get_tris_per_surf()
+        return dict(zip(self.entityset_ranges['Surfaces'], t_p_s.tolist()))
+
+    def get_triangles_per_vertex_hist(self):
+        """Get the histogram of the number of triangles on each vertex that
+        is connected to at least one triangle
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        t_p_v_hist : a numpy array where t_p_v_hist[n] is the number of
+                     vertices that touch n triangles
+        """
+        t_p_v_hist = np.bincount(self.get_model_mesh().get_tris_per_vert())
+        if len(t_p_v_hist) > 0:
+            t_p_v_hist[0] = 0
+        return t_p_v_hist
+
+    def get_triangle_aspect_ratio(self, meshset=None):
+        """Get the aspect ratios of the triangles of a meshset
+
+        inputs
+        ------
+        meshset : (optional) a volume, a surface or the root set. By default
+                  the whole model is used.
+
+        outputs
+        -------
+        t_a_r : numpy array of the triangle aspect ratios
+        """
+        return self.get_mesh(meshset).get_tri_geometry()['aspect_ratio']
+
+    def get_area_triangle(self, meshset=None):
+        """Get the areas of the triangles of a meshset
+
+        inputs
+        ------
+        meshset : (optional) a volume, a surface or the root set. By default
+                  the whole model is used.
+
+        outputs
+        -------
+        area : numpy array of the triangle areas
+        """
+        return self.get_mesh(meshset).get_tri_geometry()['area']
+
+    def get_coarseness(self):
+        """Get the coarseness (number of triangles per unit area) of each
+        surface
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        coarseness : numpy array of the coarseness for the surfaces
+        """
+        mesh = self.get_model_mesh()
+        return mesh.get_tris_per_surf() / mesh.get_surf_area()
+
+    def get_roughness(self):
+        """Get the local roughness values of all the vertices that are
+        connected to at least one triangle
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        roughness : numpy array of the local roughness values, aligned with
+                    the vert_handles of the model mesh (see
+                    dagmc_stats.get_roughness for the same values as a
+                    dictionary)
+        """
+        return self.get_model_mesh().get_roughness()
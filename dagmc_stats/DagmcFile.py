@@ -1,10 +1,98 @@
-import pandas as pd
+from types import MappingProxyType
+
 import numpy as np
 from pymoab.rng import Range
 from pymoab import core, types
 import warnings
 
 
+def range_to_array(rng):
+    """Convert a MOAB Range of entity handles to a compact uint64 NumPy
+    array. This is the conversion to use where handles have to leave a
+    Range, since a Python list would box every handle.
+
+    inputs
+    ------
+    rng : MOAB Range (or any iterable) of entity handles
+
+    outputs
+    -------
+    handles : numpy uint64 array of the handles, in the order of rng
+    """
+    return np.fromiter(rng, dtype=np.uint64, count=len(rng))
+
+
+def get_surface_tris(my_core, surfaces):
+    """Get the triangles of a list of surfaces as one uint64 array, with the
+    triangles of each surface stored as one contiguous segment
+
+    inputs
+    ------
+    my_core : a MOAB Core instance
+    surfaces : list (or MOAB Range) of surface entities
+
+    outputs
+    -------
+    tris : uint64 array of triangle entities, in the order of surfaces
+    surf_offsets : (S + 1,) int64 array of the segment boundaries. The
+                   triangles of surface s are
+                   tris[surf_offsets[s]:surf_offsets[s + 1]]
+    """
+    tris_lst = [range_to_array(my_core.get_entities_by_type(surface,
+                                                            types.MBTRI))
+                for surface in surfaces]
+    surf_offsets = np.zeros(len(tris_lst) + 1, dtype=np.int64)
+    np.cumsum([len(tris) for tris in tris_lst], out=surf_offsets[1:])
+    if len(tris_lst) == 0:
+        tris = np.zeros(0, dtype=np.uint64)
+    else:
+        tris = np.concatenate(tris_lst)
+    return tris, surf_offsets
+
+
+geom_set_struct = np.dtype({'names': ['handle', 'geom_dim', 'global_id',
+                                      'category'],
+                            'formats': [np.uint64, np.int32, np.int32,
+                                        'S32']})
+
+# values of the geom_set_struct fields of the sets that lack the tag
+missing_tag_values = {'geom_dim': -1, 'global_id': -1, 'category': b''}
+
+
+def get_set_tag_data(my_core, tag, sets, key):
+    """Read a tag of entity sets in one bulk call. The bulk call fails if
+    any set lacks the tag, and then the sets are read one at a time, so that
+    only the sets without the tag miss its value.
+
+    inputs
+    ------
+    my_core : a MOAB Core instance
+    tag : MOAB Tag to read
+    sets : MOAB Range of entity sets
+    key : the geom_set_struct field of the tag ('geom_dim', 'global_id' or
+          'category'), which gives the dtype and missing value
+
+    outputs
+    -------
+    values : numpy array of the tag values, aligned with sets. The sets
+             without the tag get missing_tag_values[key].
+    """
+    if len(sets) == 0:
+        return np.zeros(0, dtype=geom_set_struct[key])
+    try:
+        return np.asarray(my_core.tag_get_data(tag, sets, flat=True))
+    except RuntimeError:
+        values = np.full(len(sets), missing_tag_values[key],
+                         dtype=geom_set_struct[key])
+        for i, entity_set in enumerate(sets):
+            try:
+                values[i] = my_core.tag_get_data(tag, entity_set,
+                                                 flat=True)[0]
+            except RuntimeError:
+                pass
+        return values
+
+
 class DagmcFile:
 
     def __init__(self, filename, populate=False):
@@ -32,12 +120,29 @@ class DagmcFile:
         self.__set_dagmc_tags()
         self.entityset_ranges = {}
         self.__set_entityset_ranges()
-        self.dim_dict = {}
-        self.__set_dimension_meshset()
+        self._global_id_index = {}
 
         # if populate is True:
         #    self.__populate_triangle_data(meshset)
 
+    @property
+    def dim_dict(self):
+        """A read-only view of the geometric entity sets of each dimension.
+        It replaces the meshsets that used to be created to hold the sets of
+        each dimension: the values are now the MOAB Ranges of
+        entityset_ranges, so no meshsets are added to the model.
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        dim_dict : a read-only mapping of the form {'nodes': Range, 'curves':
+                   Range, 'surfaces': Range, 'volumes': Range}
+        """
+        return MappingProxyType(self.entityset_ranges)
+
     def __set_native_ranges(self):
         """Set the class native_ranges variable to a dictionary with MOAB
         ranges for each of the requested entity types
@@ -85,7 +190,12 @@ class DagmcFile:
 
     def __set_entityset_ranges(self):
         """Set a dictionary with MOAB Ranges that are specific to the
-        types.MBENTITYSET type
+        types.MBENTITYSET type. The handles are kept as run-length MOAB
+        Ranges. The GEOM_DIMENSION, GLOBAL_ID and CATEGORY tags of all the
+        geometric entity sets are read in one bulk call each into the class
+        geom_set_data variable, and the sets are partitioned by dimension
+        with masks over it. Sets that lack the GLOBAL_ID or CATEGORY tag get
+        the values of missing_tag_values.
 
         inputs
         ------
@@ -95,27 +205,56 @@ class DagmcFile:
         -------
         none
         """
+        # all the entity sets with a GEOM_DIMENSION tag, whatever its value
+        geom_sets = self._my_moab_core.get_entities_by_type_and_tag(
+            self.root_set, types.MBENTITYSET, self.dagmc_tags['geom_dim'],
+            [None])
+        self.geom_set_data = np.zeros(len(geom_sets), dtype=geom_set_struct)
+        if len(geom_sets) > 0:
+            self.geom_set_data['handle'] = range_to_array(geom_sets)
+            for key in ['geom_dim', 'global_id', 'category']:
+                self.geom_set_data[key] = self.__get_set_tag_data(key,
+                                                                  geom_sets)
         for dimension, set_type in self.entityset_types.items():
+            mask = self.geom_set_data['geom_dim'] == dimension
             self.entityset_ranges[set_type] = \
-                list(self._my_moab_core.get_entities_by_type_and_tag(self.root_set, types.MBENTITYSET,
-                                                                self.dagmc_tags['geom_dim'], [dimension]))
+                Range(self.geom_set_data['handle'][mask].tolist())
 
-    def __set_dimension_meshset(self):
-        """Set the class dim_dict variable to a dictionary with the
-        meshset for each dimension
+    def __get_set_tag_data(self, key, geom_sets):
+        """Read a tag of the geometric entity sets (see get_set_tag_data)
 
         inputs
         ------
-        none
+        key : the dagmc_tags key of the tag
+        geom_sets : MOAB Range of the geometric entity sets
 
         outputs
         -------
-        none
+        values : the tag values, aligned with geom_sets. The sets without the
+                 tag get missing_tag_values[key].
         """
-        for set_type, entityset_range in self.entityset_ranges.items():
-            dim_ms = self._my_moab_core.create_meshset()
-            self._my_moab_core.add_entity(dim_ms, entityset_range)
-            self.dim_dict[set_type] = dim_ms
+        return get_set_tag_data(self._my_moab_core, self.dagmc_tags[key],
+                                geom_sets, key)
+
+    def __get_global_id_index(self, dim):
+        """Get the GLOBAL_ID index of the entity sets of a dimension. The
+        index is built from geom_set_data the first time it is needed.
+
+        inputs
+        ------
+        dim : (Integer) dimension of the entity sets
+
+        outputs
+        -------
+        sorted_ids : the global ids of the entity sets, sorted
+        sorted_handles : the entity set handles, aligned with sorted_ids
+        """
+        if dim not in self._global_id_index:
+            dim_data = self.geom_set_data[self.geom_set_data['geom_dim'] == dim]
+            order = np.argsort(dim_data['global_id'], kind='stable')
+            self._global_id_index[dim] = (dim_data['global_id'][order],
+                                          dim_data['handle'][order])
+        return self._global_id_index[dim]
 
     def get_meshset_by_id(self, dim, ids=[]):
         """Get meshset of the geometry with specified dimension and ids
@@ -132,7 +271,8 @@ class DagmcFile:
                   dim will be checked. If dim is invalid, the root set will be
                   returned. Then, if id is empty, all entities with the given
                   dim will be returned. If is is not in the given dim range),
-                  an empty list will be returned.
+                  an empty list will be returned. The meshset is always
+                  returned as a list of handles.
         """
         plural_names = list(self.entityset_types.values())
         sing_names = [name[:-1] for name in plural_names]
@@ -151,15 +291,26 @@ class DagmcFile:
 
         # if no id is passed in
         if len(ids) == 0:
-            return self.entityset_ranges[dim]
+            return list(self.entityset_ranges[dim])
 
-        meshset = []
-        for id in ids:
-            meshset.extend(self._my_moab_core.get_entities_by_type_and_tag(self.dim_dict[dim],
-                                                                           types.MBENTITYSET, self.dagmc_tags['global_id'], [id]))
+        # look all the ids up at once in the sorted index. An id may match
+        # several entity sets, which are returned together in id order.
+        sorted_ids, sorted_handles = self.__get_global_id_index(
+            plural_names.index(dim))
+        ids = np.asarray(ids)
+        first = np.searchsorted(sorted_ids, ids, side='left')
+        counts = np.searchsorted(sorted_ids, ids, side='right') - first
+        offsets = np.cumsum(counts) - counts
+        positions = np.arange(counts.sum()) + np.repeat(first - offsets, counts)
+        meshset = sorted_handles[positions].tolist()
+        missing = ids[counts == 0]
         # if id is not in the given dim range
         if not meshset:
             warnings.warn(
                 'ID is not in the given dimension range! ' +
                 'Empty list will be returned.')
+        elif len(missing) > 0:
+            warnings.warn(
+                'IDs ' + str(missing.tolist()) + ' are not in the given ' +
+                'dimension range and will be skipped.')
         return meshset
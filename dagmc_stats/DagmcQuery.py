@@ -1,12 +1,40 @@
 from pymoab.rng import Range
 from pymoab import core, types
-import pandas as pd
 import numpy as np
 import warnings
+from .MetricTable import MetricTable
+from .TriangleMesh import TriangleMesh
+from .DagmcFile import range_to_array, get_surface_tris
 
 
 class DagmcQuery:
-    def __init__(self, dagmc_file, meshset=None):
+    # metric name : metric store it is kept in, method that calculates it,
+    # metrics it needs and mesh intermediates it reads
+    _METRICS = {
+        'tri_per_vert': {'table': '_vert_metrics',
+                         'calc': 'calc_tris_per_vert',
+                         'requires': [], 'reads': []},
+        'tri_per_surf': {'table': '_surf_metrics',
+                         'calc': 'calc_tris_per_surf',
+                         'requires': [], 'reads': []},
+        'surf_per_vol': {'table': '_vol_metrics',
+                         'calc': 'calc_surfs_per_vol',
+                         'requires': [], 'reads': []},
+        'aspect_ratio': {'table': '_tri_metrics',
+                         'calc': 'calc_triangle_aspect_ratio',
+                         'requires': [], 'reads': ['tri_geometry']},
+        'area': {'table': '_tri_metrics',
+                 'calc': 'calc_area_triangle',
+                 'requires': [], 'reads': ['tri_geometry']},
+        'coarseness': {'table': '_surf_metrics',
+                       'calc': 'calc_coarseness',
+                       'requires': ['area'], 'reads': ['surf_area']},
+        'roughness': {'table': '_vert_metrics',
+                      'calc': 'calc_roughness',
+                      'requires': ['area'], 'reads': ['roughness']},
+    }
+
+    def __init__(self, dagmc_file, meshset=None, workers=1, threads=1):
         """This class provides the functionality for making queries about
         various metrics for the meshset(s) of interest.
 
@@ -15,6 +43,17 @@ class DagmcQuery:
             dagmc_file : DagmcFile instance
             meshset: the meshset on which query will be performed.
                 The rootset will be used by default.
+            workers : number of worker processes that compute() uses for the
+                per-triangle, per-surface and roughness metrics. The surfaces
+                are split into shards balanced by triangle count, and the
+                vertices into blocks that carry a halo of the triangles around
+                them. Worker processes need Python 3.8 or later. By default
+                everything runs in this process.
+            threads : number of threads that the per-triangle and per-vertex
+                kernels split their work across, in cache-sized chunks. This
+                avoids the process start-up and data transfer of workers for
+                mid-sized models. By default the kernels run in the calling
+                thread.
 
         outputs
         -------
@@ -22,18 +61,20 @@ class DagmcQuery:
         """
         self.dagmc_file = dagmc_file
         self.meshset = meshset
+        self.workers = workers
+        self.threads = threads
         self.meshset_lst = []
         self.vols = []
         self.__rationalize_meshset()
         self.__get_entities()
         self.__get_tris()
         self.__get_verts()
-        # initialize data frames
-        self._vert_data = pd.DataFrame()
-        self._tri_data = pd.DataFrame()
-        self._surf_data = pd.DataFrame()
-        self._vol_data = pd.DataFrame()
-        self._tri_vert_data = []
+        self.__get_mesh_arrays()
+        # initialize the columnar metric stores
+        self._vert_metrics = MetricTable(self.verts, 'vert_eh')
+        self._tri_metrics = MetricTable(self.tris, 'tri_eh')
+        self._surf_metrics = MetricTable(self.meshset_lst, 'surf_eh')
+        self._vol_metrics = MetricTable(self.vols, 'vol_eh')
 
         # dictionary for storing global (across the meshset list) of
         # the metrics calculated
@@ -50,7 +91,11 @@ class DagmcQuery:
         -------
             none
         """
-        if type(self.meshset) != list:
+        if isinstance(self.meshset, Range):
+            self.meshset = list(self.meshset)
+        elif isinstance(self.meshset, np.ndarray):
+            self.meshset = self.meshset.tolist()
+        elif type(self.meshset) != list:
             self.meshset = [self.meshset]
         if self.dagmc_file.root_set in self.meshset or self.meshset == [None]:
             self.meshset = self.dagmc_file.entityset_ranges['volumes']
@@ -90,7 +135,7 @@ class DagmcQuery:
         if len(self.meshset_lst) == 0:
             warnings.warn('Specified meshset(s) are not surfaces or ' +
                             'volumes. Rootset will be used by default.')
-            self.meshset_lst = self.dagmc_file.entityset_ranges['surfaces']
+            self.meshset_lst = list(self.dagmc_file.entityset_ranges['surfaces'])
 
     def __get_tris(self):
         """Get triangles of a volume if geom_dim is 3
@@ -103,14 +148,13 @@ class DagmcQuery:
 
         outputs
         -------
-            tris : a list of triangle entities
+            tris : a uint64 array of triangle entities. The triangles of each
+                surface are stored as one contiguous segment, in the order of
+                meshset_lst, and the segment of surface s is
+                tris[_surf_offsets[s]:_surf_offsets[s + 1]]
         """
-        tris_lst = []
-        for meshset in self.meshset_lst:
-            tris = self.dagmc_file._my_moab_core.get_entities_by_type(
-                meshset, types.MBTRI)
-            tris_lst.extend(tris)
-        self.tris = tris_lst
+        self.tris, self._surf_offsets = get_surface_tris(
+            self.dagmc_file._my_moab_core, self.meshset_lst)
 
     def __get_verts(self):
         """Get vertices of a volume if geom_dim is 3
@@ -123,13 +167,202 @@ class DagmcQuery:
 
         outputs
         -------
-            verts : a list of vertex entities
+            verts : a sorted uint64 array of vertex entities
         """
-        verts = set()
+        verts = Range()
         for item in self.meshset_lst:
-            verts.update(self.dagmc_file._my_moab_core.get_entities_by_type(
+            verts.merge(self.dagmc_file._my_moab_core.get_entities_by_type(
                 item, types.MBVERTEX))
-        self.verts = list(verts)
+        self.verts = range_to_array(verts)
+
+    def __get_mesh_arrays(self):
+        """Fetch the connectivity of all the triangles and the coordinates of
+        all the vertices with bulk MOAB calls into a TriangleMesh, the array
+        engine that computes and caches all the geometric metrics
+
+        inputs
+        ------
+            none
+
+        outputs
+        -------
+            none
+        """
+        self._mesh = TriangleMesh.from_moab(self.dagmc_file._my_moab_core,
+                                            self.tris, verts=self.verts,
+                                            surf_offsets=self._surf_offsets,
+                                            threads=self.threads)
+        # the mesh adds the triangle vertices that the meshsets do not hold
+        self.verts = self._mesh.vert_handles
+
+    def get_tri_geometry(self):
+        """Get the side lengths, angles, area and aspect ratio of all the
+        triangles. They are computed together by one fused kernel the first
+        time they are needed and cached, so that every later metric is a
+        column lookup.
+
+        inputs
+        ------
+            none
+
+        outputs
+        -------
+            tri_geometry : numpy structured array aligned with self.tris
+                (see geometry.tri_geom_struct)
+        """
+        return self._mesh.get_tri_geometry()
+
+    def __has_metric(self, name):
+        """Check whether a metric has been calculated
+
+        inputs
+        ------
+            name : metric name (see _METRICS)
+
+        outputs
+        -------
+            has_metric : (boolean) whether the metric column exists
+        """
+        return name in getattr(self, self._METRICS[name]['table'])
+
+    def compute(self, metrics, release=False):
+        """Calculate a list of metrics. The metrics they require are added to
+        the plan and every metric is calculated exactly once, after the
+        metrics it requires. The mesh intermediates (triangle geometry,
+        curvature, ...) are computed once and stay cached for the metrics
+        that are requested later, unless release is set.
+
+        inputs
+        ------
+            metrics : list of metric names, any of 'tri_per_vert',
+                'tri_per_surf', 'surf_per_vol', 'aspect_ratio', 'area',
+                'coarseness' and 'roughness'
+            release : (boolean) whether to free each mesh intermediate as
+                soon as no metric left in the plan reads it, to bound the
+                memory use of large models
+
+        outputs
+        -------
+            none
+        """
+        plan = []
+
+        def add_to_plan(name):
+            if name in plan or self.__has_metric(name):
+                return
+            for required in self._METRICS[name]['requires']:
+                add_to_plan(required)
+            plan.append(name)
+
+        for name in metrics:
+            if name not in self._METRICS:
+                warnings.warn('Unknown metric ' + str(name) +
+                              ' will not be calculated.')
+                continue
+            add_to_plan(name)
+
+        # count the metrics of the plan that read each intermediate
+        reads = {name: TriangleMesh.get_dependencies(
+            self._METRICS[name]['reads']) for name in plan}
+        readers = {}
+        for name in plan:
+            for intermediate in reads[name]:
+                readers[intermediate] = readers.get(intermediate, 0) + 1
+
+        workers = self.workers
+        if workers > 1:
+            # only the worker processes need multiprocessing, so it is not
+            # imported with the module
+            from . import parallel
+
+            if parallel.shared_memory is None:
+                warnings.warn('Worker processes need Python 3.8 or later. ' +
+                              'The metrics are computed in this process.')
+                workers = 1
+
+        if workers > 1:
+            # compute the triangle geometry and surface areas of the plan in
+            # worker processes, one shard of surfaces each, unless they are
+            # cached already (the surface areas are a cheap reduction of the
+            # triangle geometry, which every reader of them also reads)
+            if 'tri_geometry' in readers and \
+                    not self._mesh.is_cached('tri_geometry'):
+                parallel.compute_surface_shards(self._mesh, workers)
+                if release and 'surf_area' not in readers:
+                    self._mesh.release('surf_area')
+            # and the roughness, one block of vertices with its halo of
+            # triangles each
+            if 'roughness' in readers and \
+                    not self._mesh.is_cached('roughness'):
+                parallel.compute_roughness_partitions(self._mesh, workers)
+
+        for name in plan:
+            getattr(self, self._METRICS[name]['calc'])()
+            for intermediate in reads[name]:
+                readers[intermediate] -= 1
+                if release and readers[intermediate] == 0:
+                    self._mesh.release(intermediate)
+
+    def __get_metric(self, name):
+        """Get the column of a metric, calculating it first if needed
+
+        inputs
+        ------
+            name : metric name (see _METRICS)
+
+        outputs
+        -------
+            column : NumPy array of the metric values aligned with the rows of
+                the metric store, or None if the metric can not be calculated
+                for the meshset(s)
+        """
+        self.compute([name])
+        table = getattr(self, self._METRICS[name]['table'])
+        if name not in table:
+            return None
+        return table.get_column(name)
+
+    @property
+    def tri_per_vert(self):
+        """Number of triangles per vertex, aligned with self.verts
+        """
+        return self.__get_metric('tri_per_vert')
+
+    @property
+    def tri_per_surf(self):
+        """Number of triangles per surface, aligned with self.meshset_lst
+        """
+        return self.__get_metric('tri_per_surf')
+
+    @property
+    def surf_per_vol(self):
+        """Number of surfaces per volume, aligned with self.vols
+        """
+        return self.__get_metric('surf_per_vol')
+
+    @property
+    def aspect_ratio(self):
+        """Triangle aspect ratio, aligned with self.tris
+        """
+        return self.__get_metric('aspect_ratio')
+
+    @property
+    def area(self):
+        """Triangle area, aligned with self.tris
+        """
+        return self.__get_metric('area')
+
+    @property
+    def coarseness(self):
+        """Surface coarseness, aligned with self.meshset_lst
+        """
+        return self.__get_metric('coarseness')
+
+    @property
+    def roughness(self):
+        """Vertex local roughness, aligned with self.verts
+        """
+        return self.__get_metric('roughness')
 
     def get_tri_side_length(self, tri):
         """Get side lengths of triangle
@@ -181,20 +414,32 @@ class DagmcQuery:
         -------
             none
         """
-        if 'tri_per_vert' in self._vert_data:
+        if 'tri_per_vert' in self._vert_metrics:
             warnings.warn('Tri_per_vert already exists. ' +
                           'tris_per_vert() will not be called.')
             return
-        t_p_v_data = []
-        tri_dimension = 2
-        for vert in self.verts:
-            tpv_val = self.dagmc_file._my_moab_core.get_adjacencies(
-                vert, tri_dimension).size()
-            if ignore_zero and tpv_val == 0:
-                continue
-            row_data = {'vert_eh': vert, 'tri_per_vert': tpv_val}
-            t_p_v_data.append(row_data)
-        self.__update_vert_data(t_p_v_data)
+        tpv_val = self._mesh.get_tris_per_vert()
+        keep = (tpv_val > 0) if ignore_zero else np.full(len(tpv_val), True)
+        self._vert_metrics.add_column('tri_per_vert', tpv_val[keep], rows=keep)
+
+    def get_tris_per_vert_hist(self, ignore_zero=True):
+        """Get the histogram of the number of triangles per vertex, counted
+        from the triangle connectivity
+
+        inputs
+        ------
+            ignore_zero : (boolean) whether or not to ignore the vertices that
+                are not connected to any triangle
+
+        outputs
+        -------
+            tpv_hist : numpy array where tpv_hist[n] is the number of vertices
+                with n triangles
+        """
+        tpv_hist = np.bincount(self._mesh.get_tris_per_vert())
+        if ignore_zero and len(tpv_hist) > 0:
+            tpv_hist[0] = 0
+        return tpv_hist
         
     def calc_tris_per_surf(self):
         """Calculate triangle per surface data
@@ -207,17 +452,12 @@ class DagmcQuery:
         -------
             none
         """
-        if 'tri_per_surf' in self._surf_data:
+        if 'tri_per_surf' in self._surf_metrics:
             warnings.warn('Tri_per_surf already exists. ' +
                           'tris_per_surf() will not be called.')
             return
-        t_p_s_data = []
-        for surf in self.meshset_lst:
-            num_tris = self.dagmc_file._my_moab_core.get_entities_by_type(
-                surf, types.MBTRI).size()
-            row_data = {'surf_eh': surf, 'tri_per_surf': num_tris}
-            t_p_s_data.append(row_data)
-        self.__update_surf_data(t_p_s_data)
+        t_p_s_data = self._mesh.get_tris_per_surf()
+        self._surf_metrics.add_column('tri_per_surf', t_p_s_data)
 
     def calc_surfs_per_vol(self):
         """Calculate surface per volume data
@@ -233,86 +473,41 @@ class DagmcQuery:
         if len(self.vols) == 0:
             warnings.warn('Volume list is empty.')
             return
-        if 'surf_per_vol' in self._surf_data:
+        if 'surf_per_vol' in self._vol_metrics:
             warnings.warn('Surf_per_vol already exists. ' +
                           'calc_surfs_per_vol() will not be called.')
             return
-        s_p_v_data = []
-        for vol in self.vols:
-            num_surfs = self.dagmc_file._my_moab_core.get_child_meshsets(vol).size()
-            row_data = {'vol_eh': vol, 'surf_per_vol': num_surfs}
-            s_p_v_data.append(row_data)
-        self.__update_vol_data(s_p_v_data)
-
-    def __update_vert_data(self, new_data):
-        """Update _vert_data dataframe
-
-        inputs
-        ------
-            new_data : vert data to be added to the _vert_data dataframe
-
-        outputs
-        -------
-            none
+        s_p_v_data = np.zeros(len(self.vols), dtype=np.int64)
+        for vol_index, vol in enumerate(self.vols):
+            s_p_v_data[vol_index] = \
+                self.dagmc_file._my_moab_core.get_child_meshsets(vol).size()
+        self._vol_metrics.add_column('surf_per_vol', s_p_v_data)
+
+    @property
+    def _vert_data(self):
+        """DataFrame view of the vertex metrics (see MetricTable.to_dataframe)
         """
-        # todo
-        #self.vert_data.concat(self.vert_data, new_data)
-        if self._vert_data.empty:
-            self._vert_data = self._vert_data.append(new_data)
-        else:
-            self._vert_data = self._vert_data.merge(
-                pd.DataFrame(new_data), on='vert_eh', how='left')
+        return self._vert_metrics.to_dataframe()
 
-    def __update_tri_data(self, new_data):
-        """Update _tri_data dataframe
-
-        inputs
-        ------
-            new_data : triangle data to be added to the _tri_data dataframe
-
-        outputs
-        -------
-            none
+    @property
+    def _tri_data(self):
+        """DataFrame view of the triangle metrics (see
+        MetricTable.to_dataframe)
         """
-        if self._tri_data.empty:
-            self._tri_data = self._tri_data.append(new_data)
-        else:
-            self._tri_data = self._tri_data.merge(
-                pd.DataFrame(new_data), on='tri_eh', how='left')
+        return self._tri_metrics.to_dataframe()
 
-    def __update_surf_data(self, new_data):
-        """Update _surf_data dataframe
-
-        inputs
-        ------
-            new_data : surface data to be added to the _surf_data dataframe
-
-        outputs
-        -------
-            none
+    @property
+    def _surf_data(self):
+        """DataFrame view of the surface metrics (see
+        MetricTable.to_dataframe)
         """
-        if self._surf_data.empty:
-            self._surf_data = self._surf_data.append(new_data)
-        else:
-            self._surf_data = self._surf_data.merge(
-                pd.DataFrame(new_data), on='surf_eh', how='left')
+        return self._surf_metrics.to_dataframe()
 
-    def __update_vol_data(self, new_data):
-        """Update _vol_data dataframe
-
-        inputs
-        ------
-            new_data : volume data to be added to the _vol_data dataframe
-
-        outputs
-        -------
-            none
+    @property
+    def _vol_data(self):
+        """DataFrame view of the volume metrics (see MetricTable.to_dataframe)
         """
-        if self._vol_data.empty:
-            self._vol_data = self._vol_data.append(new_data)
-        else:
-            self._vol_data = self._vol_data.merge(
-                pd.DataFrame(new_data), on='vol_eh', how='left')
+        return self._vol_metrics.to_dataframe()
 
     def calc_triangle_aspect_ratio(self):
         """Calculate triangle aspect ratio data (according to the equation:
@@ -326,20 +521,12 @@ class DagmcQuery:
         -------
             none
         """
-        if 'aspect_ratio' in self._tri_data:
+        if 'aspect_ratio' in self._tri_metrics:
             warnings.warn('Triangle aspect ratio already exists. ' +
                           'Calc_triangle_aspect_ratio() will not be called.')
             return
-        t_a_r_data = []
-        for tri in self.tris:
-            side_lengths = list(self.get_tri_side_length(tri).values())
-            s = 0.5 * (sum(side_lengths))
-            top = np.prod(side_lengths)
-            bottom = 8 * np.prod(s - side_lengths)
-            t_a_r = top / bottom
-            row_data = {'tri_eh': tri, 'aspect_ratio': t_a_r}
-            t_a_r_data.append(row_data)
-        self.__update_tri_data(t_a_r_data)
+        t_a_r = self.get_tri_geometry()['aspect_ratio']
+        self._tri_metrics.add_column('aspect_ratio', t_a_r)
 
     def calc_area_triangle(self):
         """Calculate the triangle area data (according to the Heron's formula:
@@ -353,19 +540,12 @@ class DagmcQuery:
         -------
             none
         """
-        if 'area' in self._tri_data:
+        if 'area' in self._tri_metrics:
             warnings.warn('Triangle area already exists. ' +
                           'Calc_area_triangle() will not be called.')
             return
-        tri_area = []
-        for tri in self.tris:
-            side_lengths = list(self.get_tri_side_length(tri).values())
-            # sqrt(s(s - a)(s - b)(s - c)), where s = (a + b + c)/2
-            s = sum(side_lengths)/2
-            s = np.sqrt(s * np.prod(s - side_lengths))
-            row_data = {'tri_eh': tri, 'area': s}
-            tri_area.append(row_data)
-        self.__update_tri_data(tri_area)
+        area = self.get_tri_geometry()['area']
+        self._tri_metrics.add_column('area', area)
 
     def calc_coarseness(self):
         """Calculate the density of facets on a surface (num tris / total area)
@@ -378,130 +558,26 @@ class DagmcQuery:
         -------
             none
         """
-        if 'coarseness' in self._surf_data:
+        if 'coarseness' in self._surf_metrics:
             warnings.warn('Coarseness already exists. ' +
                           'Calc_coarseness() will not be called.')
             return
 
-        coarseness = []
-        surf_area = []
-        self.calc_area_triangle()
-        for surf in self.meshset_lst:
-            tris = self.dagmc_file._my_moab_core.get_entities_by_type(
-                surf, types.MBTRI)
-            area = self._tri_data.loc[self._tri_data['tri_eh'].isin(
-                list(tris)), 'area'].sum()
-            cval = len(tris) / area
-            row_data = {'surf_eh': surf, 'coarseness': cval}
-            area_data = {'surf_eh': surf, 'area': area}
-            coarseness.append(row_data)
-            surf_area.append(area_data)
-        self.__update_surf_data(coarseness)
-        self.__update_surf_data(surf_area)
-
-        weighted_coarseness = (self._surf_data['coarseness'] * self._surf_data['area']).sum()
-        total_area = self._surf_data['area'].sum()
+        if 'area' not in self._tri_metrics:
+            self.calc_area_triangle()
+        # one segmented reduction over the per-surface triangle segments
+        surf_area = self._mesh.get_surf_area()
+        num_tris = self._mesh.get_tris_per_surf()
+        coarseness = num_tris / surf_area
+        self._surf_metrics.add_column('coarseness', coarseness)
+        self._surf_metrics.add_column('area', surf_area)
+
+        # surfaces without triangles have a NaN (0/0) coarseness and no area
+        weighted_coarseness = np.nansum(coarseness * surf_area)
+        total_area = surf_area.sum()
         average_coarseness = weighted_coarseness / total_area
         self._global_averages['coarseness_ave'] = average_coarseness
 
-    def __get_tri_vert_data(self):
-        """Build a numpy structured array to store triangle and vertex related
-        data in the form of triangle entity handle | vertex entity handle
-        | angle connected to the vertex | side length of side opposite to
-        vertex in the triangle
-
-        inputs
-        ------
-        none
-
-        outputs
-        -------
-        none
-        """
-        tri_vert_struct = np.dtype({
-            'names': ['tri', 'vert', 'angle', 'side_length'],
-            'formats': [np.uint64, np.uint64, np.float64, np.float64]})
-        self._tri_vert_data = np.zeros(len(self.tris) * 3, dtype=tri_vert_struct)
-        tri_vert_index = 0
-
-        for tri in self.tris:
-            side_lengths = self.get_tri_side_length(tri)  # {vert: side_length}
-            side_length_sum_sq_half = sum(map(lambda i: i**2,
-                                          side_lengths.values())) / 2.
-            side_length_prod = np.prod(list(side_lengths.values()))
-            verts = side_lengths.keys()
-            for vert_i in verts:
-                side_i = side_lengths[vert_i]
-                d_i = np.arccos((side_length_sum_sq_half -
-                                (side_i**2)) * side_i / side_length_prod)
-                tri_vert_entry = np.array((tri, vert_i, d_i, side_i),
-                               dtype=tri_vert_struct)
-                self._tri_vert_data[tri_vert_index] = tri_vert_entry
-                tri_vert_index += 1
-
-    def __gaussian_curvature(self, vert_i):
-        """Get gaussian curvature value of a vertex
-        Reference: https://www.sciencedirect.com/science/article/pii/
-        S0097849312001203
-        Formula 1
-
-        inputs
-        ------
-            vert_i : vertex entity handle
-
-        outputs
-        -------
-            gc : gaussian curvature value of the vertex
-        """
-        vert_entries = self._tri_vert_data[self._tri_vert_data['vert'] == vert_i]
-        sum_alpha_angles = sum(vert_entries['angle'])
-        gc = np.abs(2 * np.pi - sum_alpha_angles)
-        return gc
-
-    def __get_lri(self, vert_i, gc_all):
-        """Get local roughness value of a vertex
-        Reference: https://www.sciencedirect.com/science/article/pii/
-        S0097849312001203
-        Formula 2, 3
-
-        inputs
-        ------
-            vert_i : vertex entity handle
-            gc_all : dictionary in the form of vertex : gaussian curvature
-                value of the vertex
-
-        outputs
-        -------
-            Lri : local roughness value of the vertex
-        """
-        DIJgc_sum = 0
-        Dii_sum = 0
-        adj_tris = self.dagmc_file._my_moab_core.get_adjacencies(
-                vert_i, 2, op_type=0)
-        adj_tris = list(set(adj_tris) & set(self.tris))
-        vert_j_list = list(self.dagmc_file._my_moab_core.get_adjacencies(
-            adj_tris, 0, op_type=1))
-        vert_j_list.remove(vert_i)
-        for vert_j in vert_j_list:
-            # get tri_ij_list (the list of the two triangles connected to both
-            # vert_i and vert_j)
-            tri_j_list = self.dagmc_file._my_moab_core.get_adjacencies(
-                vert_j, 2, op_type=0)
-            tri_ij_list = list(set(adj_tris) & set(tri_j_list))
-            # rows with tri value as tri_ij_list[0] or tri_ij_list[1]
-            select_tris = (self._tri_vert_data['tri'] == tri_ij_list[0]) | \
-                          (self._tri_vert_data['tri'] == tri_ij_list[-1])
-            # rows with vert value not equal to vert_i and not equal to vert_j
-            vert_filter = (self._tri_vert_data['vert'] != vert_i) & \
-                            (self._tri_vert_data['vert'] != vert_j)
-            beta_angles = self._tri_vert_data[select_tris & vert_filter]['angle']
-            Dij = 0.5 * (1. / np.tan(beta_angles[0]) +
-                         1. / np.tan(beta_angles[-1]))
-            DIJgc_sum += (Dij * gc_all[vert_j])
-            Dii_sum += Dij
-        Lri = abs(gc_all[vert_i] - DIJgc_sum / Dii_sum)
-        return Lri
-
     def __calc_average_roughness(self):
         """Calculate global average roughness using equation 5 of reference
         below and update the global averages dictionary.
@@ -516,25 +592,13 @@ class DagmcQuery:
         -------
             none
         """
-        self.calc_area_triangle()  # get area data if not already calculated
-        vert_area = []
-        for vert in self.verts:
-            # get adjacent triangles and their areas
-            tris = self.dagmc_file._my_moab_core.get_adjacencies(
-                vert, 2, op_type=0)
-            area_sum = self._tri_data.loc[
-                self._tri_data['tri_eh'].isin(tris)]['area'].sum()
-            row_data = {'vert_eh': vert, 'area': area_sum}
-            vert_area.append(row_data)
-        self.__update_vert_data(vert_area)
-        
-        # si = 1/3 of total area of adjacent triangles
-        # sum of denominator
-        si_total = (self._vert_data['area'].sum())/3.0
-        # sum of numerator
-        lri_si_total = (self._vert_data['area']/3.0 * self._vert_data['roughness']).sum()
+        if 'area' not in self._tri_metrics:
+            self.calc_area_triangle()
+        # scatter the triangle areas onto their vertices
+        self._vert_metrics.add_column('area', self._mesh.get_vert_area())
         # calc average according to formula 5
-        average_roughness = lri_si_total / si_total
+        average_roughness = self._mesh.get_average_roughness(
+            self._vert_metrics.get_column('roughness'))
 
         # update global average dictionary
         self._global_averages['roughness_ave'] = average_roughness
@@ -555,16 +619,8 @@ class DagmcQuery:
         -------
             none
         """
-        self.__get_tri_vert_data()
-        gc_all = {}
-        for vert_i in self.verts:
-            gc_all[vert_i] = self.__gaussian_curvature(vert_i)
-        roughness_per_vert = []
-        for vert in self.verts:
-            rval = self.__get_lri(vert, gc_all)
-            row_data = {'vert_eh': vert, 'roughness': rval}
-            roughness_per_vert.append(row_data)
-        self.__update_vert_data(roughness_per_vert)
+        # formula 2 for all the vertices as one sparse matrix-vector product
+        self._vert_metrics.add_column('roughness', self._mesh.get_roughness())
 
         # calculate average for meshset list
         self.__calc_average_roughness()
@@ -584,15 +640,10 @@ class DagmcQuery:
         -------
             none
         """
-        tri_roughness = []
-        for tri in self.tris:
-            three_verts = list(self.dagmc_file._my_moab_core.get_adjacencies(tri, 0, op_type=1))
-            sum_lr = self._vert_data.loc[
-                self._vert_data['vert_eh'].isin(three_verts)]['roughness'].sum()
-            rval = sum_lr/3.0
-            row_data = {'tri_eh': tri, 'roughness': rval}
-            tri_roughness.append(row_data)
-        self.__update_tri_data(tri_roughness)
+        # gather the vertex roughness values through the connectivity
+        tri_roughness = self._mesh.get_tri_roughness(
+            self._vert_metrics.get_column('roughness'))
+        self._tri_metrics.add_column('roughness', tri_roughness)
 
     def add_tag(self, tag_name, tag_type, tag_dic=None):
         """Add tag according to given tag information
@@ -0,0 +1,100 @@
+import numpy as np
+
+
+class MetricTable:
+
+    def __init__(self, handles, handle_name):
+        """Constructor
+
+        A columnar store of metric values for a fixed, ordered list of
+        entities. Every metric is kept in its own NumPy column that is
+        allocated once and aligned with the entity order, so that adding a
+        metric never copies or merges the other columns.
+
+        inputs
+        ------
+        handles : entity handles that define the row order of the table
+        handle_name : name of the entity handle column in exported tables,
+                      e.g. 'vert_eh'
+
+        outputs
+        -------
+        none
+        """
+        self.handles = np.asarray(handles, dtype=np.uint64)
+        self.handle_name = handle_name
+        self._columns = {}
+        self._valid = {}
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __len__(self):
+        return len(self.handles)
+
+    def add_column(self, name, values, rows=None):
+        """Add the values of a metric as a new column
+
+        inputs
+        ------
+        name : name of the metric
+        values : metric values, aligned with the table rows if rows is None
+                 and with the selected rows otherwise
+        rows : (optional) boolean mask or integer index of the rows that
+               values are given for. The other rows are left missing.
+
+        outputs
+        -------
+        none
+        """
+        values = np.asarray(values)
+        column = np.zeros(len(self.handles), dtype=values.dtype)
+        valid = np.zeros(len(self.handles), dtype=bool)
+        if rows is None:
+            column[:] = values
+            valid[:] = True
+        else:
+            column[rows] = values
+            valid[rows] = True
+        self._columns[name] = column
+        self._valid[name] = valid
+
+    def get_column(self, name):
+        """Get the column of a metric, aligned with the table rows
+
+        inputs
+        ------
+        name : name of the metric
+
+        outputs
+        -------
+        column : NumPy array of the metric values. Missing rows hold zero.
+        """
+        return self._columns[name]
+
+    def to_dataframe(self):
+        """Export the table as a pandas DataFrame. Only the rows that have at
+        least one metric value are exported, and missing values are NaN.
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        data : pandas DataFrame with the entity handle column followed by one
+               column per metric
+        """
+        import pandas as pd
+        if not self._columns:
+            return pd.DataFrame()
+        rows = np.logical_or.reduce(list(self._valid.values()))
+        data = {self.handle_name: self.handles[rows]}
+        for name, column in self._columns.items():
+            values = column[rows]
+            missing = ~self._valid[name][rows]
+            if missing.any():
+                values = values.astype(np.float64)
+                values[missing] = np.nan
+            data[name] = values
+        return pd.DataFrame(data)
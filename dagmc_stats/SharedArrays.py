@@ -0,0 +1,150 @@
+import weakref
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # multiprocessing.shared_memory needs Python 3.8 or later. Without it
+    # DagmcQuery computes everything in a single process.
+    shared_memory = None
+
+import numpy as np
+
+
+def unlink_blocks(blocks):
+    """Close and remove shared memory blocks, ignoring blocks that are
+    already gone
+
+    inputs
+    ------
+    blocks : list of SharedMemory instances
+
+    outputs
+    -------
+    none
+    """
+    for block in blocks:
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedArrays:
+
+    def __init__(self, arrays=None):
+        """Constructor
+
+        A set of named NumPy arrays held in multiprocessing.shared_memory
+        blocks, so that worker processes can map them instead of receiving
+        pickled copies. The process that creates the blocks owns them: they
+        are removed by close(), when the with block or the instance goes
+        away, or at interpreter exit. If the owner is killed, the
+        multiprocessing resource tracker removes them.
+
+        inputs
+        ------
+        arrays : (optional) dictionary of the arrays to copy into shared
+                 memory, by name
+
+        outputs
+        -------
+        none
+        """
+        self._blocks = []
+        self._arrays = {}
+        self.descriptor = {}
+        self._finalizer = weakref.finalize(self, unlink_blocks, self._blocks)
+        if arrays is not None:
+            for name, array in arrays.items():
+                self.empty(name, np.shape(array), np.asarray(array).dtype)[...] \
+                    = array
+
+    @classmethod
+    def from_mesh(cls, mesh):
+        """Export the coordinates, triangle connectivity and surface offsets
+        of a TriangleMesh (e.g. the one of a DagmcQuery) to shared memory
+
+        inputs
+        ------
+        mesh : TriangleMesh instance
+
+        outputs
+        -------
+        shared : SharedArrays instance with the arrays 'coords', 'conn' and
+                 'surf_offsets'
+        """
+        return cls({'coords': mesh.coords, 'conn': mesh.conn,
+                    'surf_offsets': mesh.surf_offsets})
+
+    def empty(self, name, shape, dtype):
+        """Allocate a new shared array, e.g. for worker processes to write
+        their results into
+
+        inputs
+        ------
+        name : name of the array
+        shape : shape of the array
+        dtype : NumPy dtype of the array
+
+        outputs
+        -------
+        array : the array, backed by a new shared memory block
+        """
+        dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        self._blocks.append(block)
+        self._arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        self.descriptor[name] = (block.name, shape, dtype)
+        return self._arrays[name]
+
+    def __getitem__(self, name):
+        return self._arrays[name]
+
+    def close(self):
+        """Release the arrays and remove the shared memory blocks. Arrays
+        that are needed afterwards must be copied first.
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        none
+        """
+        self._arrays.clear()
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def attach(descriptor, writable=()):
+    """Map shared arrays that another process created, without copying them
+
+    inputs
+    ------
+    descriptor : the descriptor of a SharedArrays instance
+    writable : names of the arrays that may be written to. All the other
+               arrays are read-only views.
+
+    outputs
+    -------
+    arrays : dictionary of the arrays, by name
+    blocks : list of the SharedMemory instances that back the arrays. They
+             must be kept alive as long as the arrays are used.
+    """
+    arrays = {}
+    blocks = []
+    for name, (block_name, shape, dtype) in descriptor.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.flags.writeable = name in writable
+        arrays[name] = array
+    return arrays, blocks
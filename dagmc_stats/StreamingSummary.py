@@ -0,0 +1,247 @@
+from itertools import islice
+
+import numpy as np
+
+
+class StreamingSummary:
+
+    # quantiles reported next to the median, by name
+    QUANTILES = {'p1': 0.01, 'p5': 0.05, 'p95': 0.95, 'p99': 0.99}
+
+    def __init__(self, exact=False, relative_accuracy=0.01, chunk_size=65536):
+        """Constructor
+
+        A summary of a dataset that is fed in chunks. The count, minimum,
+        maximum, mean and variance are always exact and are updated chunk by
+        chunk. The quantiles come from a mergeable logarithmic sketch
+        (DDSketch, https://arxiv.org/abs/1908.10693) that holds one counter
+        per bucket of relative width 2 * relative_accuracy, so every
+        reported quantile is within relative_accuracy of the exact value.
+        In exact mode the values are kept instead and the quantiles are
+        computed with np.percentile. NaN values are ignored. If all the
+        values are integers, the minimum and maximum are reported as
+        integers.
+
+        inputs
+        ------
+        exact : (boolean) whether to keep all the values for exact quantiles
+        relative_accuracy : relative accuracy of the quantile sketch
+        chunk_size : number of values that are processed at a time when the
+                     data is given as a Python iterable
+
+        outputs
+        -------
+        none
+        """
+        self.exact = exact
+        self.relative_accuracy = relative_accuracy
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.mean = 0.
+        self.integer = True
+        # sum of the squared differences from the mean
+        self._m2 = 0.
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self._gamma)
+        # sketch buckets of the positive and of the negative values (by
+        # magnitude) as sorted bucket indices and their counts
+        self._buckets = {1: (np.zeros(0, dtype=np.int64), np.zeros(0)),
+                         -1: (np.zeros(0, dtype=np.int64), np.zeros(0))}
+        self._zero_count = 0
+        self._values = []
+
+    def update(self, data):
+        """Add values to the summary
+
+        inputs
+        ------
+        data : a NumPy array or any iterable of numbers. Iterables are
+               consumed chunk_size values at a time, so that they are never
+               held in memory as a whole.
+
+        outputs
+        -------
+        none
+        """
+        if isinstance(data, np.ndarray):
+            self.__update_chunk(data.ravel())
+            return
+        iterator = iter(data)
+        while True:
+            # the dtype is inferred, so that integer data stays integer
+            chunk = np.array(list(islice(iterator, self.chunk_size)))
+            if len(chunk) == 0:
+                break
+            self.__update_chunk(chunk)
+
+    def __update_chunk(self, chunk):
+        """Add a chunk of values to the summary
+
+        inputs
+        ------
+        chunk : one dimensional NumPy array of values
+
+        outputs
+        -------
+        none
+        """
+        if len(chunk) == 0:
+            return
+        self.integer = self.integer and np.issubdtype(chunk.dtype,
+                                                      np.integer)
+        chunk = np.asarray(chunk, dtype=np.float64)
+        chunk = chunk[~np.isnan(chunk)]
+        if len(chunk) == 0:
+            return
+        self.__merge_moments(len(chunk), chunk.min(), chunk.max(),
+                             chunk.mean(), ((chunk - chunk.mean())**2).sum())
+        if self.exact:
+            self._values.append(chunk)
+            return
+        self._zero_count += np.count_nonzero(chunk == 0)
+        for sign in self._buckets:
+            magnitude = sign * chunk[sign * chunk > 0]
+            keys = np.ceil(np.log(magnitude) / self._log_gamma)
+            self.__merge_buckets(sign, keys.astype(np.int64),
+                                 np.ones(len(keys)))
+
+    def __merge_moments(self, count, minimum, maximum, mean, m2):
+        """Combine the exact moments of the summary with those of another
+        set of values (Chan et al. parallel variance update)
+
+        inputs
+        ------
+        count, minimum, maximum, mean, m2 : the moments of the other values
+
+        outputs
+        -------
+        none
+        """
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+
+    def __merge_buckets(self, sign, keys, counts):
+        """Add counts to the sketch buckets of positive (sign = 1) or negative
+        (sign = -1) values
+
+        inputs
+        ------
+        sign : 1 or -1
+        keys : bucket indices
+        counts : counts aligned with keys
+
+        outputs
+        -------
+        none
+        """
+        old_keys, old_counts = self._buckets[sign]
+        keys, index = np.unique(np.concatenate([old_keys, keys]),
+                                return_inverse=True)
+        counts = np.bincount(np.ravel(index),
+                             weights=np.concatenate([old_counts, counts]),
+                             minlength=len(keys))
+        self._buckets[sign] = (keys, counts)
+
+    def merge(self, other):
+        """Merge another summary, e.g. one built from another chunk of the
+        data in another process, into this one. Both summaries must use the
+        same mode and relative accuracy.
+
+        inputs
+        ------
+        other : StreamingSummary instance
+
+        outputs
+        -------
+        none
+        """
+        if other.count == 0:
+            return
+        self.integer = self.integer and other.integer
+        self.__merge_moments(other.count, other.minimum, other.maximum,
+                             other.mean, other._m2)
+        self._values.extend(other._values)
+        self._zero_count += other._zero_count
+        for sign, (keys, counts) in other._buckets.items():
+            self.__merge_buckets(sign, keys, counts)
+
+    @property
+    def variance(self):
+        """Population variance of the values
+        """
+        return self._m2 / self.count if self.count > 0 else np.nan
+
+    def quantile(self, q):
+        """Get a quantile of the values. The value at rank q * (count - 1)
+        is estimated from the sketch, or interpolated between the ranks
+        around it in exact mode (as np.percentile does).
+
+        inputs
+        ------
+        q : quantile, between 0 and 1
+
+        outputs
+        -------
+        value : the quantile value
+        """
+        if self.count == 0:
+            return np.nan
+        if self.exact:
+            if len(self._values) > 1:
+                self._values = [np.concatenate(self._values)]
+            return np.percentile(self._values[0], 100 * q)
+        rank = q * (self.count - 1)
+        # walk the buckets in increasing value order: negative values by
+        # decreasing magnitude, zeros, then positive values
+        neg_keys, neg_counts = self._buckets[-1]
+        pos_keys, pos_counts = self._buckets[1]
+        keys = np.concatenate([neg_keys[::-1], [0], pos_keys])
+        signs = np.concatenate([np.full(len(neg_keys), -1.), [0.],
+                                np.ones(len(pos_keys))])
+        counts = np.concatenate([neg_counts[::-1], [self._zero_count],
+                                 pos_counts])
+        bucket = np.searchsorted(np.cumsum(counts), rank, side='right')
+        bucket = min(bucket, len(keys) - 1)
+        # the bucket (gamma^(k-1), gamma^k] is represented by the value whose
+        # relative distance to both ends is relative_accuracy
+        value = signs[bucket] * 2 * self._gamma**keys[bucket] / \
+            (self._gamma + 1)
+        return min(max(value, self.minimum), self.maximum)
+
+    def get_stats(self):
+        """Get the statistics of the values
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        statistics : a dictionary with the minimum, maximum, median, mean,
+                     variance and the QUANTILES of the values. The minimum
+                     and maximum of integer values are integers. All the
+                     statistics are NaN if there are no values.
+        """
+        statistics = {}
+        if self.count == 0:
+            statistics['minimum'] = np.nan
+            statistics['maximum'] = np.nan
+        elif self.integer:
+            statistics['minimum'] = int(self.minimum)
+            statistics['maximum'] = int(self.maximum)
+        else:
+            statistics['minimum'] = self.minimum
+            statistics['maximum'] = self.maximum
+        statistics['median'] = self.quantile(0.5)
+        statistics['mean'] = self.mean if self.count > 0 else np.nan
+        statistics['variance'] = self.variance
+        for name, q in self.QUANTILES.items():
+            statistics[name] = self.quantile(q)
+        return statistics
@@ -0,0 +1,384 @@
+import numpy as np
+
+try:
+    from . import geometry
+except ImportError:
+    # imported as a top level module by generate_stats.py
+    import geometry
+
+
+class TriangleMesh:
+
+    # the cached intermediate results and the intermediates each of them is
+    # computed from
+    DEPENDENCIES = {'tri_geometry': [],
+                    'vert_tri_adjacency': [],
+                    'surf_area': ['tri_geometry'],
+                    'gaussian_curvature': ['tri_geometry'],
+                    'cotangent_weights': ['tri_geometry'],
+                    'roughness': ['gaussian_curvature', 'cotangent_weights']}
+
+    def __init__(self, coords, conn, vert_handles=None, tri_handles=None,
+                 surf_offsets=None, threads=1):
+        """Constructor
+
+        The bulk-array engine behind the geometric metrics. A triangle mesh
+        is held as a vertex coordinate array and a triangle connectivity
+        array, and every intermediate result (triangle geometry, gaussian
+        curvature, cotangent weights, ...) is computed with the
+        kernels of the geometry module the first time it is needed and
+        cached.
+
+        inputs
+        ------
+        coords : (V, 3) float array of vertex coordinates
+        conn : (T, 3) integer array of triangle connectivity, given as row
+               indices into coords
+        vert_handles : (optional) uint64 array of the vertex entity handles,
+                       aligned with coords
+        tri_handles : (optional) uint64 array of the triangle entity handles,
+                      aligned with conn
+        surf_offsets : (optional) (S + 1,) integer array of the boundaries of
+                       the surface segments of the triangles. Surface s owns
+                       the triangles surf_offsets[s]:surf_offsets[s + 1]. By
+                       default all the triangles form a single segment.
+        threads : (optional) number of threads that the kernels split their
+                  per-triangle and per-vertex work across (see
+                  geometry.map_chunks). By default everything runs in the
+                  calling thread.
+
+        outputs
+        -------
+        none
+        """
+        self.coords = coords
+        self.conn = conn
+        self.vert_handles = vert_handles
+        self.tri_handles = tri_handles
+        if surf_offsets is None:
+            surf_offsets = [0, len(conn)]
+        self.surf_offsets = np.asarray(surf_offsets, dtype=np.int64)
+        self.threads = threads
+        self._cache = {}
+
+    @classmethod
+    def from_moab(cls, my_core, tris, verts=None, surf_offsets=None,
+                  threads=1):
+        """Build a TriangleMesh with one bulk get_connectivity and one bulk
+        get_coords call
+
+        inputs
+        ------
+        my_core : a MOAB Core instance
+        tris : triangle entities (MOAB Range or uint64 array)
+        verts : (optional) sorted uint64 array of vertex entities, e.g. the
+                vertices of the surface sets of tris. The vertices of tris
+                that verts misses (surface sets written by some tools hold
+                only triangles) are added to them. By default the vertices
+                of tris are used.
+        surf_offsets : (optional) boundaries of the surface segments of tris
+                       (see the constructor)
+        threads : (optional) number of threads of the kernels (see the
+                  constructor)
+
+        outputs
+        -------
+        mesh : TriangleMesh instance
+        """
+        if isinstance(tris, np.ndarray):
+            tri_handles = tris.astype(np.uint64, copy=False)
+        else:
+            tri_handles = np.fromiter(tris, dtype=np.uint64, count=len(tris))
+        if len(tri_handles) == 0:
+            conn = np.zeros(0, dtype=np.uint64)
+        else:
+            conn = np.asarray(my_core.get_connectivity(tri_handles),
+                              dtype=np.uint64)
+        if verts is None:
+            vert_handles, conn = np.unique(conn, return_inverse=True)
+        else:
+            vert_handles = np.asarray(verts, dtype=np.uint64)
+            # the vertex handles are sorted, so they can be turned into row
+            # indices of the coordinate array with a binary search
+            index = np.searchsorted(vert_handles, conn)
+            found = index < len(vert_handles)
+            found[found] = vert_handles[index[found]] == conn[found]
+            if found.all():
+                conn = index
+            else:
+                vert_handles, index = np.unique(
+                    np.concatenate([vert_handles, conn]), return_inverse=True)
+                conn = np.ravel(index)[len(verts):]
+        if len(vert_handles) == 0:
+            coords = np.zeros((0, 3))
+        else:
+            coords = np.asarray(my_core.get_coords(vert_handles),
+                                dtype=np.float64).reshape(-1, 3)
+        return cls(coords, conn.reshape(-1, 3), vert_handles=vert_handles,
+                   tri_handles=tri_handles, surf_offsets=surf_offsets,
+                   threads=threads)
+
+    @property
+    def num_verts(self):
+        return len(self.coords)
+
+    @property
+    def num_tris(self):
+        return len(self.conn)
+
+    @classmethod
+    def get_dependencies(cls, names):
+        """Get the intermediates that a list of intermediates is computed
+        from, including the intermediates themselves
+
+        inputs
+        ------
+        names : list of intermediate names (see DEPENDENCIES)
+
+        outputs
+        -------
+        dependencies : set of intermediate names
+        """
+        dependencies = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name not in dependencies:
+                dependencies.add(name)
+                stack.extend(cls.DEPENDENCIES[name])
+        return dependencies
+
+    def release(self, name):
+        """Free a cached intermediate result. It is computed again if it is
+        needed later.
+
+        inputs
+        ------
+        name : intermediate name (see DEPENDENCIES)
+
+        outputs
+        -------
+        none
+        """
+        self._cache.pop(name, None)
+
+    def is_cached(self, name):
+        """Check whether an intermediate result is cached
+
+        inputs
+        ------
+        name : intermediate name (see DEPENDENCIES)
+
+        outputs
+        -------
+        is_cached : (boolean) whether the intermediate is cached
+        """
+        return name in self._cache
+
+    def store(self, name, value):
+        """Store an intermediate result that was computed elsewhere, e.g. in
+        worker processes, so that it is not computed again
+
+        inputs
+        ------
+        name : intermediate name (see DEPENDENCIES)
+        value : the intermediate result, as the get_ method of name would
+                return it
+
+        outputs
+        -------
+        none
+        """
+        self._cache[name] = value
+
+    def get_tri_geometry(self):
+        """Get the side lengths, angles, area and aspect ratio of all the
+        triangles (see geometry.tri_geometry)
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        tri_geometry : numpy structured array aligned with conn
+        """
+        if 'tri_geometry' not in self._cache:
+            self._cache['tri_geometry'] = geometry.tri_geometry(
+                self.coords, self.conn, threads=self.threads)
+        return self._cache['tri_geometry']
+
+    def get_tris_per_vert(self):
+        """Get the number of triangles adjacent to each vertex
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        t_p_v : integer array aligned with coords
+        """
+        return geometry.tris_per_vert(self.conn, self.num_verts,
+                                      threads=self.threads)
+
+    def get_tris_per_surf(self):
+        """Get the number of triangles in each surface segment
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        t_p_s : integer array with one entry per surface segment
+        """
+        return np.diff(self.surf_offsets)
+
+    def get_surf_area(self):
+        """Get the area of each surface segment with one segmented reduction
+        over the triangle areas
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        surf_area : float array with one entry per surface segment
+        """
+        if 'surf_area' not in self._cache:
+            self._cache['surf_area'] = geometry.segment_sum(
+                self.get_tri_geometry()['area'], self.surf_offsets)
+        return self._cache['surf_area']
+
+    def get_vert_tri_adjacency(self):
+        """Get the compressed sparse row vertex->triangle index (see
+        geometry.vert_tri_adjacency)
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        indptr, indices : the CSR index arrays
+        """
+        if 'vert_tri_adjacency' not in self._cache:
+            self._cache['vert_tri_adjacency'] = \
+                geometry.vert_tri_adjacency(self.conn, self.num_verts)
+        return self._cache['vert_tri_adjacency']
+
+    def get_gaussian_curvature(self):
+        """Get the gaussian curvature values of all the vertices (see
+        geometry.gaussian_curvature)
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        gc : float array aligned with coords
+        """
+        if 'gaussian_curvature' not in self._cache:
+            self._cache['gaussian_curvature'] = geometry.gaussian_curvature(
+                self.conn, self.get_tri_geometry()['angles'], self.num_verts,
+                threads=self.threads)
+        return self._cache['gaussian_curvature']
+
+    def get_cotangent_weights(self):
+        """Get the cotangent weights D_ij of all the edges as a sparse
+        matrix in coordinate form (see geometry.cotangent_weights)
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        rows, cols, weights : vertex indices i, j and weight D_ij of each
+                              nonzero entry
+        """
+        if 'cotangent_weights' not in self._cache:
+            self._cache['cotangent_weights'] = geometry.cotangent_weights(
+                self.conn, self.get_tri_geometry()['angles'], self.num_verts,
+                threads=self.threads)
+        return self._cache['cotangent_weights']
+
+    def get_roughness(self):
+        """Get the local roughness values of all the vertices (see
+        geometry.local_roughness)
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        lri : float array aligned with coords, NaN for the vertices that are
+              not connected to any triangle
+        """
+        if 'roughness' not in self._cache:
+            rows, cols, weights = self.get_cotangent_weights()
+            self._cache['roughness'] = geometry.local_roughness(
+                self.get_gaussian_curvature(), rows, cols, weights,
+                threads=self.threads)
+        return self._cache['roughness']
+
+    def get_vert_area(self):
+        """Get the total area of the triangles adjacent to each vertex (see
+        geometry.vert_area)
+
+        inputs
+        ------
+        none
+
+        outputs
+        -------
+        area : float array aligned with coords
+        """
+        return geometry.vert_area(self.conn, self.get_tri_geometry()['area'],
+                                  self.num_verts, threads=self.threads)
+
+    def get_tri_roughness(self, vert_roughness=None):
+        """Get the triangle average roughness by gathering the roughness
+        values of the triangle vertices through the connectivity
+
+        inputs
+        ------
+        vert_roughness : (optional) float array of vertex roughness values
+                         aligned with coords. By default get_roughness() is
+                         used.
+
+        outputs
+        -------
+        tri_roughness : float array aligned with conn
+        """
+        if vert_roughness is None:
+            vert_roughness = self.get_roughness()
+        return vert_roughness[self.conn].sum(axis=1)/3.0
+
+    def get_average_roughness(self, vert_roughness=None):
+        """Get the average roughness of the mesh, weighting each vertex by
+        one third of the area of its adjacent triangles
+        Reference: https://www.sciencedirect.com/science/article/pii/
+        S0097849312001203
+        Formula 5
+
+        inputs
+        ------
+        vert_roughness : (optional) float array of vertex roughness values
+                         aligned with coords. By default get_roughness() is
+                         used.
+
+        outputs
+        -------
+        average_roughness : the area weighted average roughness
+        """
+        if vert_roughness is None:
+            vert_roughness = self.get_roughness()
+        # si = 1/3 of total area of adjacent triangles
+        si = self.get_vert_area()/3.0
+        # isolated vertices have no roughness and no area
+        return np.nansum(si * vert_roughness) / si.sum()
@@ -4,6 +4,16 @@ import numpy as np
 from pymoab.rng import Range
 from pymoab import core, types
 
+try:
+    from . import geometry
+    from .DagmcFile import get_surface_tris
+    from .TriangleMesh import TriangleMesh
+except ImportError:
+    # imported as a top level module by generate_stats.py
+    import geometry
+    from DagmcFile import get_surface_tris
+    from TriangleMesh import TriangleMesh
+
 tri_vert_struct = np.dtype({'names': ['tri', 'vert', 'angle',
 'side_length'], 'formats': [np.uint64, np.uint64, np.float64, np.float64]})
 
@@ -87,10 +97,16 @@ def get_entityset_ranges(my_core, meshset, geom_dim):
 
     entityset_ranges = {}
     entityset_types = ['Nodes', 'Curves', 'Surfaces', 'Volumes']
+    # read the dimension of all the geometric entity sets in one bulk call
+    # and partition them with masks
+    geom_sets = my_core.get_entities_by_type_and_tag(meshset, types.MBENTITYSET,
+                                                     geom_dim, [None])
+    handles = np.fromiter(geom_sets, dtype=np.uint64, count=len(geom_sets))
+    dims = np.zeros(len(geom_sets), dtype=np.int32)
+    if len(geom_sets) > 0:
+        dims[:] = my_core.tag_get_data(geom_dim, geom_sets, flat=True)
     for dimension, set_type in enumerate(entityset_types):
-        entityset_ranges[set_type] = \
-            my_core.get_entities_by_type_and_tag(meshset, types.MBENTITYSET,
-                                                 geom_dim, [dimension])
+        entityset_ranges[set_type] = Range(handles[dims == dimension].tolist())
     return entityset_ranges
 
 
@@ -112,14 +128,45 @@ def get_triangles_per_vertex(my_core, native_ranges, ignore_zero=True):
     t_p_v_data : a list of the number of triangles each vertex touches
     """
 
-    t_p_v_data = []
-    tri_dimension = 2
-    for vertex in native_ranges[types.MBVERTEX]:
-        tpv_val = my_core.get_adjacencies(vertex, tri_dimension).size()
-        if ignore_zero and tpv_val == 0:
-            continue
-        t_p_v_data.append(tpv_val)
-    return np.array(t_p_v_data)
+    verts = native_ranges[types.MBVERTEX]
+    vert_handles = np.fromiter(verts, dtype=np.uint64, count=len(verts))
+    tris = native_ranges[types.MBTRI]
+    if len(tris) == 0:
+        conn = np.zeros(0, dtype=np.uint64)
+    else:
+        conn = np.asarray(my_core.get_connectivity(tris), dtype=np.uint64)
+    # count the occurrences of each vertex in the triangle connectivity
+    t_p_v_data = geometry.tris_per_vert(np.searchsorted(vert_handles, conn),
+                                        len(vert_handles))
+    if ignore_zero:
+        t_p_v_data = t_p_v_data[t_p_v_data > 0]
+    return t_p_v_data
+
+
+def get_triangles_per_vertex_hist(my_core, native_ranges, ignore_zero=True):
+    """
+    This function will return the histogram of the number of triangles on
+    each vertex in a file
+
+    inputs
+    ------
+    my_core : a MOAB Core instance
+    native_ranges : a dictionary containing ranges for each native type in the
+                    file (VERTEX, TRIANGLE, ENTITYSET)
+    ignore_zero : a boolean value that indicates whether to ignore the
+                  vertices that are not connected to any triangles.
+
+    outputs
+    -------
+    t_p_v_hist : a numpy array where t_p_v_hist[n] is the number of vertices
+                 that touch n triangles
+    """
+    t_p_v_data = get_triangles_per_vertex(my_core, native_ranges,
+                                          ignore_zero=False)
+    t_p_v_hist = np.bincount(t_p_v_data)
+    if ignore_zero and len(t_p_v_hist) > 0:
+        t_p_v_hist[0] = 0
+    return t_p_v_hist
 
 
 def get_triangles_per_surface(my_core, entity_ranges):
@@ -183,22 +230,20 @@ def get_tris(my_core, meshset, geom_dim):
 
     outputs
     -------
-    tris : a list of triangle entities
+    tris : a Range of triangle entities
     """
 
+    # the triangles are gathered by merging Ranges, so that no scratch
+    # meshset is added to the model
+    dim = my_core.tag_get_data(geom_dim, meshset)[0][0]
     # get triangles of a volume
-    if my_core.tag_get_data(geom_dim, meshset)[0][0] == 3:
-        entities = my_core.create_meshset()
+    if dim == 3:
+        tris = Range()
         for surface in my_core.get_child_meshsets(meshset):
-            my_core.add_entities(
-                entities, my_core.get_entities_by_type(surface, types.MBTRI))
-        tris = my_core.get_entities_by_type(entities, types.MBTRI)
+            tris.merge(my_core.get_entities_by_type(surface, types.MBTRI))
     # get triangles of a surface
-    elif my_core.tag_get_data(geom_dim, meshset)[0][0] == 2:
-        entities = my_core.create_meshset()
-        my_core.add_entities(
-            entities, my_core.get_entities_by_type(meshset, types.MBTRI))
-        tris = my_core.get_entities_by_type(entities, types.MBTRI)
+    elif dim == 2:
+        tris = my_core.get_entities_by_type(meshset, types.MBTRI)
     else:
         # get all the triangles
         tris = my_core.get_entities_by_type(meshset, types.MBTRI)
@@ -246,6 +291,25 @@ def get_tri_side_length(my_core, tri):
     return side_lengths
 
 
+def get_tri_geometry(my_core, tris):
+    """
+    Get the side lengths, angles, area and aspect ratio of a set of triangles
+    with bulk MOAB calls and a single fused pass (see
+    TriangleMesh.get_tri_geometry)
+
+    inputs
+    ------
+    my_core : a MOAB Core instance
+    tris : triangle entities
+
+    outputs
+    -------
+    tri_geom : numpy structured array with one entry per triangle, in the
+               order of tris
+    """
+    return TriangleMesh.from_moab(my_core, tris).get_tri_geometry()
+
+
 def get_triangle_aspect_ratio(my_core, meshset, geom_dim):
     """
     Get the triangle aspect ratio (according to the equation:
@@ -263,14 +327,7 @@ def get_triangle_aspect_ratio(my_core, meshset, geom_dim):
     """
 
     tris = get_tris(my_core, meshset, geom_dim)
-    t_a_r = []
-
-    for tri in tris:
-        side_lengths = list(get_tri_side_length(my_core, tri).values())
-        s = .5*(sum(side_lengths))
-        top = np.prod(side_lengths)
-        bottom = 8*np.prod(s-side_lengths)
-        t_a_r.append(top/bottom)
+    t_a_r = get_tri_geometry(my_core, tris)['aspect_ratio'].tolist()
 
     return t_a_r
 
@@ -294,15 +351,9 @@ def get_area_triangle(my_core, meshset, geom_dim, tris=[]):
     area : (list) the triangle areas in the meshset
     """
 
-    area = []
     if not tris:
         tris = get_tris(my_core, meshset, geom_dim)
-    for tri in tris:
-        side_lengths = list(get_tri_side_length(my_core, tri).values())
-        # sqrt(s(s - a)(s - b)(s - c)), where s = (a + b + c)/2
-        s = sum(side_lengths)/2
-        s = np.sqrt(s * np.prod(s - side_lengths))
-        area.append(s)
+    area = get_tri_geometry(my_core, tris)['area'].tolist()
 
     return area
 
@@ -324,11 +375,11 @@ def get_coarseness(my_core, meshset, entity_ranges, geom_dim):
     coarseness : (list) the coarseness for surfaces in the meshset.
     """
 
-    coarseness = []
-
-    for surface in entity_ranges:
-        surf_area = get_area_triangle(my_core, surface, geom_dim)
-        coarseness.append(len(surf_area)/sum(surf_area))
+    # gather the triangles of all the surfaces as contiguous segments and
+    # get the surface areas with one segmented reduction
+    tris, surf_offsets = get_surface_tris(my_core, entity_ranges)
+    mesh = TriangleMesh.from_moab(my_core, tris, surf_offsets=surf_offsets)
+    coarseness = (mesh.get_tris_per_surf() / mesh.get_surf_area()).tolist()
 
     return coarseness
 
@@ -352,26 +403,15 @@ def get_tri_vert_data(my_core, all_tris):
     all_verts : (list) all the vertices that are connected to
     triangle in the geometry
     """
-    all_verts =set()
-    tri_vert_data = np.zeros(len(all_tris)*3, dtype=tri_vert_struct)
-    tri_vert_index = 0
-
-    for tri in all_tris:
-        side_lengths = get_tri_side_length(
-            my_core, tri)   # {vert : side_length}
-        side_length_sum_sq_half = sum(map
-                                    (lambda i: i**2, side_lengths.values()))/2
-        side_length_prod = np.prod(list(side_lengths.values()))
-        verts = list(my_core.get_adjacencies(tri, 0, op_type=1))
-        for vert_i in verts:
-            all_verts.add(vert_i)
-            side_i = side_lengths[vert_i]
-            d_i = np.arccos((side_length_sum_sq_half - (side_i**2)) * side_i /
-                            side_length_prod)
-            bar = np.array((tri, vert_i, d_i, side_i), dtype=tri_vert_struct)
-            tri_vert_data[tri_vert_index] = bar
-            tri_vert_index += 1
-    return tri_vert_data, list(all_verts)
+    mesh = TriangleMesh.from_moab(my_core, all_tris)
+    tri_geom = mesh.get_tri_geometry()
+    tri_vert_data = np.zeros(mesh.num_tris*3, dtype=tri_vert_struct)
+    # three consecutive entries per triangle, one for each corner
+    tri_vert_data['tri'] = np.repeat(mesh.tri_handles, 3)
+    tri_vert_data['vert'] = mesh.vert_handles[mesh.conn].ravel()
+    tri_vert_data['angle'] = tri_geom['angles'].ravel()
+    tri_vert_data['side_length'] = tri_geom['side_lengths'].ravel()
+    return tri_vert_data, mesh.vert_handles.tolist()
 
 
 def get_gaussian_curvature(my_core, all_verts, tri_vert_data):
@@ -390,9 +430,16 @@ def get_gaussian_curvature(my_core, all_verts, tri_vert_data):
     gc_all : dictionary in the form of vertex : gaussian curvature value
     of the vertex
     """
-    gc_all = {}
-    for vert_i in all_verts:
-        gc_all[vert_i] = gaussian_curvature(vert_i, tri_vert_data)
+    # accumulate the angles of all the entries onto a dense vertex index in
+    # one pass instead of masking tri_vert_data once per vertex
+    tri_verts, vert_index = np.unique(tri_vert_data['vert'],
+                                      return_inverse=True)
+    gc = geometry.gaussian_curvature(vert_index, tri_vert_data['angle'],
+                                     len(tri_verts))
+    gc_tri_verts = dict(zip(tri_verts.tolist(), gc))
+    # vertices without any entry have no angles to sum
+    gc_all = {vert_i: gc_tri_verts.get(vert_i, 2 * np.pi)
+              for vert_i in all_verts}
     return gc_all
 
 
@@ -480,16 +527,13 @@ def get_roughness(my_core, native_ranges, verts=None):
     roughness : (dictionary) the roughness for all vertices in the meshset
     stored in the form of vert : local roughness value
     """
-    tri_vert_data, all_verts = get_tri_vert_data(my_core,
-                                                    native_ranges[types.MBTRI])
+    mesh = TriangleMesh.from_moab(my_core, native_ranges[types.MBTRI])
+    lri_all = dict(zip(mesh.vert_handles.tolist(), mesh.get_roughness()))
     if verts is None:
-        verts = all_verts
-    gc_all = get_gaussian_curvature(my_core, all_verts, tri_vert_data)
-    roughness = {}
-    for vert_i in verts:
-        roughness[vert_i] = get_lri(vert_i, gc_all, tri_vert_data, my_core)
+        return lri_all
+    roughness = {vert_i: lri_all[vert_i] for vert_i in verts}
     return roughness
-    
+
 
 def get_tri_roughness(my_core, native_ranges, roughness):
     """Get triangle average roughness
@@ -507,16 +551,14 @@ def get_tri_roughness(my_core, native_ranges, roughness):
     tri_roughness : (dictionary) the average roughness values for all triangles
     in the meshset stored in the form of tri : average roughness value
     """
-    tri_roughness = {}
-    for tri in native_ranges[types.MBTRI]:
-        three_verts = list(my_core.get_adjacencies(tri, 0, op_type=1))
-        sum_lr = 0
-        for vert in three_verts:
-            sum_lr += roughness[vert]
-        tri_roughness[tri] = sum_lr/3
+    mesh = TriangleMesh.from_moab(my_core, native_ranges[types.MBTRI])
+    vert_roughness = np.array([roughness[vert]
+                               for vert in mesh.vert_handles.tolist()])
+    tri_roughness = dict(zip(mesh.tri_handles.tolist(),
+                             mesh.get_tri_roughness(vert_roughness)))
     return tri_roughness
-    
-    
+
+
 def add_tag(my_core, tag_name, tag_dic, tag_type):
     """Add tag according to given tag information
 
@@ -555,11 +597,12 @@ def avg_roughness(my_core, roughness, geom_dim):
     avg_roughness : the average roughness value for the geometry
     """
     root_set = my_core.get_root_set()
-    area_sum = sum(get_area_triangle(my_core, root_set, geom_dim))
-    num = 0
-    for vert in roughness:
-        adj_tris = my_core.get_adjacencies(vert, 2, op_type=0)
-        s_i = get_area_triangle(my_core, root_set, geom_dim, tris=adj_tris)
-        num += roughness[vert] * sum(s_i) / 3
+    mesh = TriangleMesh.from_moab(my_core, get_tris(my_core, root_set,
+                                                    geom_dim))
+    area_sum = mesh.get_tri_geometry()['area'].sum()
+    # s_i = 1/3 of total area of adjacent triangles, scattered once over the
+    # connectivity instead of an adjacency query per vertex
+    s_i = dict(zip(mesh.vert_handles.tolist(), mesh.get_vert_area()/3))
+    num = sum(roughness[vert] * s_i.get(vert, 0) for vert in roughness)
     avg_roughness = num/area_sum
     return avg_roughness
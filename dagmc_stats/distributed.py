@@ -0,0 +1,301 @@
+import numpy as np
+
+try:
+    from . import geometry
+    from .DagmcFile import get_surface_tris
+    from .StreamingSummary import StreamingSummary
+    from .TriangleMesh import TriangleMesh
+    from .parallel import get_shards
+except ImportError:
+    # imported as a top level module by generate_stats.py
+    import geometry
+    from DagmcFile import get_surface_tris
+    from StreamingSummary import StreamingSummary
+    from TriangleMesh import TriangleMesh
+    from parallel import get_shards
+
+
+def get_rank_surfaces(tris_per_surf, comm):
+    """
+    Get the surfaces that an MPI rank analyzes. The surfaces are split into
+    one shard per rank with balanced triangle counts (see
+    parallel.get_shards), the same way on every rank.
+
+    inputs
+    ------
+    tris_per_surf : integer array with the number of triangles of each surface
+    comm : an mpi4py communicator
+
+    outputs
+    -------
+    surfs : sorted integer array of the surface indices of the rank
+    """
+    shards = get_shards(tris_per_surf, comm.size)
+    if comm.rank < len(shards):
+        return shards[comm.rank]
+    return np.zeros(0, dtype=np.int64)
+
+
+def get_rank_mesh(my_core, surfaces, surfs, threads=1):
+    """
+    Build the mesh of the triangles of the surfaces of a rank, with one
+    segment per surface
+
+    inputs
+    ------
+    my_core : a MOAB Core instance
+    surfaces : a list of all the surface entities
+    surfs : integer array of the surface indices of the rank
+    threads : (optional) number of threads of the kernels of the mesh
+
+    outputs
+    -------
+    mesh : TriangleMesh instance
+    """
+    tris, surf_offsets = get_surface_tris(
+        my_core, [surfaces[surf] for surf in surfs])
+    return TriangleMesh.from_moab(my_core, tris, surf_offsets=surf_offsets,
+                                  threads=threads)
+
+
+def get_vert_bounds(verts, num_ranks):
+    """
+    Split the vertex handles of the model into contiguous blocks with equal
+    vertex counts, one per rank. Rank r owns the vertices with handles in
+    [bounds[r - 1], bounds[r]), so the owner of any vertex is known without
+    an array over all the vertices.
+
+    inputs
+    ------
+    verts : MOAB Range of all the vertices of the model
+    num_ranks : number of ranks
+
+    outputs
+    -------
+    bounds : (num_ranks - 1,) sorted uint64 array of the first handle of
+             each block but the first (see get_owners)
+    """
+    num_verts = len(verts)
+    if num_verts == 0:
+        return np.zeros(0, dtype=np.uint64)
+    return np.array([verts[num_verts * rank // num_ranks]
+                     for rank in range(1, num_ranks)], dtype=np.uint64)
+
+
+def get_owners(bounds, handles):
+    """
+    Get the rank that owns each of a set of vertices
+
+    inputs
+    ------
+    bounds : the block boundaries of the vertex handles (see
+             get_vert_bounds)
+    handles : uint64 array of vertex handles
+
+    outputs
+    -------
+    owners : integer array with the owner rank of each handle
+    """
+    return np.searchsorted(bounds, handles, side='right')
+
+
+def exchange(comm, owners, columns):
+    """
+    Send the rows of a set of columns to the ranks that own them, with one
+    alltoall
+
+    inputs
+    ------
+    comm : an mpi4py communicator
+    owners : integer array with the destination rank of each row
+    columns : list of arrays, all with one entry per row
+
+    outputs
+    -------
+    received : list of arrays, one per column, with the rows that all the
+               ranks sent to this rank
+    """
+    order = np.argsort(owners, kind='stable')
+    splits = np.searchsorted(owners[order], np.arange(1, comm.size))
+    parts = [np.split(column[order], splits) for column in columns]
+    received = comm.alltoall(list(zip(*parts)))
+    return [np.concatenate(part) for part in zip(*received)]
+
+
+def reduce_vert_sums(comm, bounds, handles, sums):
+    """
+    Sum per-vertex quantities over the ranks on the ranks that own the
+    vertices. Only the vertices of the triangles of each rank are sent, keyed
+    by handle, so that no rank holds an array over all the vertices.
+
+    inputs
+    ------
+    comm : an mpi4py communicator
+    bounds : the block boundaries of the vertex handles (see
+             get_vert_bounds)
+    handles : uint64 array of the vertex handles of this rank
+    sums : list of arrays with the quantities of this rank, aligned with
+           handles
+
+    outputs
+    -------
+    owned_verts : sorted uint64 array of the owned vertices that are
+                  connected to a triangle of any rank
+    owned_sums : list of arrays with the sums of the quantities over all the
+                 ranks, aligned with owned_verts
+    """
+    received = exchange(comm, get_owners(bounds, handles), [handles] + sums)
+    owned_verts, index = np.unique(received[0], return_inverse=True)
+    owned_sums = [np.bincount(np.ravel(index), weights=values,
+                              minlength=len(owned_verts)).astype(values.dtype)
+                  for values in received[1:]]
+    return owned_verts, owned_sums
+
+
+def fetch_vert_values(comm, bounds, owned_verts, values, handles):
+    """
+    Get the values of vertices from the ranks that own them
+
+    inputs
+    ------
+    comm : an mpi4py communicator
+    bounds : the block boundaries of the vertex handles (see
+             get_vert_bounds)
+    owned_verts : sorted uint64 array of the vertices owned by this rank
+    values : array of the values of the owned vertices, aligned with
+             owned_verts
+    handles : uint64 array of the vertices whose values this rank needs. The
+              owners must hold them in their owned_verts.
+
+    outputs
+    -------
+    fetched : array of the values, aligned with handles
+    """
+    owners = get_owners(bounds, handles)
+    order = np.argsort(owners, kind='stable')
+    splits = np.searchsorted(owners[order], np.arange(1, comm.size))
+    requests = comm.alltoall(np.split(handles[order], splits))
+    replies = comm.alltoall([values[np.searchsorted(owned_verts, request)]
+                             for request in requests])
+    fetched = np.empty(len(handles), dtype=values.dtype)
+    fetched[order] = np.concatenate(replies)
+    return fetched
+
+
+def reduce_hist(comm, hist, root=0):
+    """
+    Sum the histograms of all the ranks on the root rank
+
+    inputs
+    ------
+    comm : an mpi4py communicator
+    hist : integer histogram of the values of this rank
+    root : rank that gets the sum
+
+    outputs
+    -------
+    hist : the summed histogram on the root rank, None elsewhere
+    """
+    hists = comm.gather(hist, root=root)
+    if comm.rank != root:
+        return None
+    total = np.zeros(max(len(rank_hist) for rank_hist in hists),
+                     dtype=np.int64)
+    for rank_hist in hists:
+        total[:len(rank_hist)] += rank_hist
+    return total
+
+
+def reduce_summary(comm, summary, root=0):
+    """
+    Merge the summaries of all the ranks on the root rank
+
+    inputs
+    ------
+    comm : an mpi4py communicator
+    summary : StreamingSummary instance of the values of this rank
+    root : rank that gets the merged summary
+
+    outputs
+    -------
+    summary : the merged StreamingSummary on the root rank, None elsewhere
+    """
+    summaries = comm.gather(summary, root=root)
+    if comm.rank != root:
+        return None
+    merged = StreamingSummary(exact=summary.exact,
+                              relative_accuracy=summary.relative_accuracy)
+    for rank_summary in summaries:
+        merged.merge(rank_summary)
+    return merged
+
+
+def summarize(comm, data, exact=False):
+    """
+    Summarize values that are spread over the ranks
+
+    inputs
+    ------
+    comm : an mpi4py communicator
+    data : the values of this rank (see StreamingSummary.update)
+    exact : (boolean) whether to keep the values for exact quantiles
+
+    outputs
+    -------
+    statistics : the statistics of the values of all the ranks on rank 0
+                 (see StreamingSummary.get_stats), None elsewhere
+    """
+    summary = StreamingSummary(exact=exact)
+    summary.update(data)
+    summary = reduce_summary(comm, summary)
+    return None if summary is None else summary.get_stats()
+
+
+def get_roughness(comm, bounds, mesh, owned_verts, gc):
+    """
+    Get the local roughness of the vertices that a rank owns (see
+    get_vert_bounds). Every rank sends the cotangents of the edges of its
+    triangles, keyed by vertex handle, to the owner of the first vertex of
+    each edge, so that the owner assembles the complete cotangent weights of
+    its vertices, including the edges that cross the surfaces of other
+    ranks. The gaussian curvature of the neighbours that the rank does not
+    own is fetched from their owners.
+
+    inputs
+    ------
+    comm : an mpi4py communicator
+    bounds : the block boundaries of the vertex handles (see
+             get_vert_bounds)
+    mesh : TriangleMesh instance of the triangles of this rank
+    owned_verts : sorted uint64 array of the owned vertices that are
+                  connected to a triangle (see reduce_vert_sums)
+    gc : gaussian curvature of the owned vertices, aligned with owned_verts
+
+    outputs
+    -------
+    roughness : float array with the local roughness of the owned vertices
+    """
+    rows, cols, cot = geometry.edge_cotangents(
+        mesh.conn, mesh.get_tri_geometry()['angles'])
+    row_verts, col_verts, cot = exchange(
+        comm, get_owners(bounds, mesh.vert_handles[rows]),
+        [mesh.vert_handles[rows], mesh.vert_handles[cols], cot])
+    # the owned vertices and their neighbours on the seams of the block
+    halo = np.setdiff1d(col_verts, owned_verts)
+    verts = np.union1d(owned_verts, halo)
+    local_gc = np.empty(len(verts))
+    local_gc[np.searchsorted(verts, owned_verts)] = gc
+    local_gc[np.searchsorted(verts, halo)] = fetch_vert_values(
+        comm, bounds, owned_verts, gc, halo)
+    rows = np.searchsorted(verts, row_verts)
+    cols = np.searchsorted(verts, col_verts)
+    # D_ij is the average of the cotangents of the edge over all the ranks
+    num_verts = len(verts)
+    edge_keys, edge_index, edge_count = np.unique(rows * num_verts + cols,
+                                                  return_inverse=True,
+                                                  return_counts=True)
+    weights = np.bincount(np.ravel(edge_index), weights=cot,
+                          minlength=len(edge_keys)) / edge_count
+    lri = geometry.local_roughness(local_gc, edge_keys // num_verts,
+                                   edge_keys % num_verts, weights)
+    return lri[np.searchsorted(verts, owned_verts)]
@@ -2,39 +2,98 @@ import numpy as np
 from pymoab.rng import Range
 from pymoab import core, types
 
+try:
+    from .DagmcFile import get_set_tag_data, get_surface_tris, range_to_array
+except ImportError:
+    # imported as a top level module by generate_stats.py
+    from DagmcFile import get_set_tag_data, get_surface_tris, range_to_array
 
-def get_spv_data(my_core, entityset_ranges, global_id):
+spv_struct = np.dtype({'names': ['volume', 'global_id', 'surfaces'],
+                       'formats': [np.uint64, np.int32, np.int64]})
+
+tps_struct = np.dtype({'names': ['surface', 'global_id', 'triangles'],
+                       'formats': [np.uint64, np.int32, np.int64]})
+
+
+def get_global_ids(my_core, entities, global_id):
+    """
+    Gets the Global IDs of a range of entity sets with one bulk tag read.
+    The sets without a Global ID get -1, as in DagmcFile
+    (see DagmcFile.get_set_tag_data).
+
+    inputs
+    ------
+    my_core : a MOAB Core instance
+    entities : a MOAB Range of entity sets
+    global_id : a MOAB Tag given to each entity in a mesh
+
+    outputs
+    -------
+    global_ids : a numpy array of the Global IDs, aligned with entities
+    """
+    return get_set_tag_data(my_core, global_id, entities, 'global_id')
+
+
+def get_spv_data(my_core, entityset_ranges, global_id, surfs_per_vol=None):
     """
     Gets the actual data for surfaces per volume
-    i.e. the number of surfaces each volume handle contains, 
+    i.e. the number of surfaces each volume handle contains,
     as well as the Global ID for the volume
-  
+
     inputs
     ------
     my_core : a MOAB Core instance
-    spv_data : a dictionary containing every volume paired with the number of child surfaces
+    entityset_ranges : a dictionary of the entityset ranges of each tag in a file
     global_id : a MOAB Tag given to each entity in a mesh
+    surfs_per_vol : (optional) the number of surfaces of each volume, in the
+                    order of entityset_ranges['Volumes'], e.g. the values of
+                    dagmc_stats.get_surfaces_per_volume. By default the child
+                    sets of each volume are counted, since MOAB has no bulk
+                    query for the children of several sets.
+
+    outputs
+    -------
+    spv_data : a numpy structured array (see spv_struct) with one
+               (volume, global_id, surfaces) row per volume
     """
-    spv_data = []
-    for volume in entityset_ranges['Volumes']:
-        spv_data.append((volume, my_core.tag_get_data(global_id, volume)[0][0], my_core.get_child_meshsets(volume).size()))
+    volumes = entityset_ranges['Volumes']
+    if surfs_per_vol is None:
+        surfs_per_vol = [my_core.get_child_meshsets(volume).size()
+                         for volume in volumes]
+    spv_data = np.zeros(len(volumes), dtype=spv_struct)
+    spv_data['volume'] = range_to_array(volumes)
+    spv_data['global_id'] = get_global_ids(my_core, volumes, global_id)
+    spv_data['surfaces'] = surfs_per_vol
     return spv_data
 
-def get_tps_data(my_core, entityset_ranges, global_id):
+
+def get_tps_data(my_core, entityset_ranges, global_id, tris_per_surf=None):
     """
     Gets the actual data for triangles per surface
-    i.e. the number of triangles each surface handle contains, 
+    i.e. the number of triangles each surface handle contains,
     as well as the Global ID for the surface
-  
+
     inputs
     ------
     my_core : a MOAB Core instance
-    tps_data : a dictionary containing every surface paired with the number of corrosponding triangles
+    entityset_ranges : a dictionary of the entityset ranges of each tag in a file
     global_id : a MOAB Tag given to each entity in a mesh
+    tris_per_surf : (optional) the number of triangles of each surface, in
+                    the order of entityset_ranges['Surfaces'], e.g. the
+                    get_tris_per_surf of the model mesh of an
+                    AnalysisSession. By default the counts are the segment
+                    lengths of DagmcFile.get_surface_tris.
+
+    outputs
+    -------
+    tps_data : a numpy structured array (see tps_struct) with one
+               (surface, global_id, triangles) row per surface
     """
-    tps_data = []
-    for surface in entityset_ranges['Surfaces']:
-        tps_data.append((surface, my_core.tag_get_data(global_id, surface)[0][0], my_core.get_entities_by_type(
-                                                                                    surface, types.MBTRI).size()))
+    surfaces = entityset_ranges['Surfaces']
+    if tris_per_surf is None:
+        tris_per_surf = np.diff(get_surface_tris(my_core, surfaces)[1])
+    tps_data = np.zeros(len(surfaces), dtype=tps_struct)
+    tps_data['surface'] = range_to_array(surfaces)
+    tps_data['global_id'] = get_global_ids(my_core, surfaces, global_id)
+    tps_data['triangles'] = tris_per_surf
     return tps_data
-
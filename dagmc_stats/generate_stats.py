@@ -1,16 +1,21 @@
 # This file is the script that users will actually run to generate the full set of statistics for a file
 
 # set the path to find the current installation of pyMOAB
+import os
 import sys
+import glob
+import warnings
 import numpy as np
 import argparse
+from contextlib import redirect_stdout
 
-from pymoab.rng import Range
 from pymoab import core, types
 
 # import the new module that defines each of the functions
 import dagmc_stats
 import entity_specific_stats
+# the analysis session and output modules are imported where they are used,
+# so that startup only loads pymoab and NumPy
 
 
 def report_stats(stats, data, verbose, display_options):
@@ -109,52 +114,109 @@ def report_stats(stats, data, verbose, display_options):
             print("{}, ({}):    {}".format(surface, global_id, triangles))
 
 
-def get_stats(data):
+def get_stats(data, exact=True):
     """
-    gets the minimum, maximum, median, and mean for a dataset
+    gets the minimum, maximum, median, mean, variance and the p1, p5, p95 and
+    p99 percentiles for a dataset. The median and percentiles are exact by
+    default, or approximated to 1% relative accuracy with a quantile sketch
+    if exact is not set (see StreamingSummary).
     
     inputs
     ------
-    data : a dataset in list form
+    data : a dataset as a NumPy array or any iterable
+    exact : (boolean) whether to compute the median and percentiles exactly
     
     outputs
     -------
     statistics : a dictionary of statistics for a given dataset
     """
     
+    from StreamingSummary import StreamingSummary
+
+    summary = StreamingSummary(exact=exact)
+    summary.update(data)
+    return summary.get_stats()
+
+
+def get_hist_stats(hist):
+    """
+    gets the minimum, maximum, median, mean, variance and the p1, p5, p95 and
+    p99 percentiles for a dataset of non-negative integers given as a
+    histogram. All of them are exact, and NaN for an empty histogram (as in
+    StreamingSummary.get_stats).
+    
+    inputs
+    ------
+    hist : a histogram in array form, where hist[n] is the number of times the
+           value n occurs in the dataset
+    
+    outputs
+    -------
+    statistics : a dictionary of statistics for a given dataset
+    """
+    
+    from StreamingSummary import StreamingSummary
+
+    values = np.flatnonzero(hist)
+    if len(values) == 0:
+        return StreamingSummary().get_stats()
+    cumulative_counts = np.cumsum(hist)
+    total = cumulative_counts[-1]
+
+    def percentile(q):
+        # interpolate between the values at the sorted positions around
+        # q * (total - 1), as np.percentile does
+        position = q * (total - 1)
+        lower, upper = np.searchsorted(
+            cumulative_counts, [np.floor(position), np.ceil(position)],
+            side='right')
+        return lower + (upper - lower) * (position - np.floor(position))
+
+    mean = np.dot(np.arange(len(hist)), hist) / total
     statistics = {}
-    statistics['minimum'] = min(data)
-    statistics['maximum'] = max(data)
-    statistics['median'] = np.median(list(data))
-    statistics['mean'] = np.mean(list(data))
+    statistics['minimum'] = values[0]
+    statistics['maximum'] = values[-1]
+    statistics['median'] = percentile(0.5)
+    statistics['mean'] = mean
+    statistics['variance'] = np.dot((np.arange(len(hist)) - mean)**2,
+                                    hist) / total
+    for name, q in StreamingSummary.QUANTILES.items():
+        statistics[name] = percentile(q)
     return statistics
 
 
-def collect_statistics(my_core, root_set, tar_meshset, display_options):
+def collect_statistics(my_core, root_set, tar_meshset, display_options,
+                       session=None, exact=True):
     """
-    Collects statistics for a range of different areas
+    Collects statistics for a range of different areas. All the statistics
+    draw from one analysis session, so the triangle geometry and cotangent
+    weights are computed at most once per meshset.
    
     inputs
     ------
     my_core : a MOAB Core instance
     root_set : the root set for a file
     tar_meshset : the meshset for the triangle aspect ratio statistic
+    session : (optional) the AnalysisSession of the file. By default a new
+              session is created.
+    exact : (boolean) whether to compute the medians and percentiles exactly
     
     outputs
     -------
     stats : a dictionary containing statistics for a variety of different areas
     """
     
+    from AnalysisSession import AnalysisSession
+
     stats = {}
     data = {}
     
-    dagmc_tags = dagmc_stats.get_dagmc_tags(my_core)
-    
-    entity_types = [types.MBVERTEX, types.MBTRI, types.MBENTITYSET]
-    native_ranges = dagmc_stats.get_native_ranges(my_core, root_set, entity_types)     # get Ranges of various entities
-    
-    entityset_ranges = dagmc_stats.get_entityset_ranges(my_core, root_set,
-                                                        dagmc_tags['geom_dim'])
+    if session is None:
+        session = AnalysisSession(my_core, root_set)
+    dagmc_tags = session.dagmc_tags
+    native_ranges = session.native_ranges     # get Ranges of various entities
+    entityset_ranges = session.entityset_ranges
+
     if display_options['NR']:
         stats['native_ranges'] = native_ranges
         
@@ -165,58 +227,319 @@ def collect_statistics(my_core, root_set, tar_meshset, display_options):
         spv_key = 'S_P_V'
         data[spv_key] = dagmc_stats.get_surfaces_per_volume(
                                     my_core, entityset_ranges)
-        stats[spv_key] = get_stats(data[spv_key].values())
+        stats[spv_key] = get_stats(data[spv_key].values(), exact)
         
     if display_options['TPS'] or display_options['SPV']:
         tps_key = 'T_P_S'
-        data[tps_key] = dagmc_stats.get_triangles_per_surface(
-                                    my_core, entityset_ranges)
-        stats[tps_key] = get_stats(data[tps_key].values())
+        data[tps_key] = session.get_triangles_per_surface()
+        stats[tps_key] = get_stats(data[tps_key].values(), exact)
         
     if display_options['TPV']:
         tpv_key = 'T_P_V'
-        data[tpv_key] = dagmc_stats.get_triangles_per_vertex(
-                                    my_core, native_ranges)
-        stats[tpv_key] = get_stats(data[tpv_key])
+        data[tpv_key] = session.get_triangles_per_vertex_hist()
+        stats[tpv_key] = get_hist_stats(data[tpv_key])
         
     if display_options['TAR'] or (tar_meshset != my_core.get_root_set()):
         tar_key = 'T_A_R'
-        data[tar_key] = dagmc_stats.get_triangle_aspect_ratio(
-                                    my_core, tar_meshset, dagmc_tags['geom_dim'])
-        stats[tar_key] = get_stats(data[tar_key])
+        data[tar_key] = session.get_triangle_aspect_ratio(tar_meshset)
+        stats[tar_key] = get_stats(data[tar_key], exact)
    
     if display_options['AT']:
         at_key = 'A_T'
-        data[at_key] = dagmc_stats.get_area_triangle(my_core, tar_meshset, dagmc_tags['geom_dim'])
-        stats[at_key] = get_stats(data[at_key])
+        data[at_key] = session.get_area_triangle(tar_meshset)
+        stats[at_key] = get_stats(data[at_key], exact)
 
     if display_options['C']:
         c_key = 'C'
-        data[c_key] = dagmc_stats.get_coarseness(my_core, root_set, 
-                                                                entityset_ranges['Surfaces'], dagmc_tags['geom_dim'])
-        stats[c_key] = get_stats(data[c_key])
+        data[c_key] = session.get_coarseness()
+        stats[c_key] = get_stats(data[c_key], exact)
     
     if display_options['R']:
         r_key = 'R'
-        data[r_key] = dagmc_stats.get_roughness(my_core, native_ranges).values()
-        stats[r_key] = get_stats(data[r_key])
+        data[r_key] = session.get_roughness()
+        stats[r_key] = get_stats(data[r_key], exact)
 
     if display_options['SPV_data']:
-        data['SPV_Entity'] = entity_specific_stats.get_spv_data(my_core,
-                                                                entityset_ranges, dagmc_tags['global_id'])
+        # the surface counts of the volumes are in data['S_P_V'] already
+        data['SPV_Entity'] = entity_specific_stats.get_spv_data(
+            my_core, entityset_ranges, dagmc_tags['global_id'],
+            list(data['S_P_V'].values()))
     if display_options['TPS_data']:
-        data['TPS_Entity'] = entity_specific_stats.get_tps_data(my_core,
-                                                                entityset_ranges, dagmc_tags['global_id'])
+        # the model mesh holds the triangle counts of the surfaces
+        data['TPS_Entity'] = entity_specific_stats.get_tps_data(
+            my_core, entityset_ranges, dagmc_tags['global_id'],
+            session.get_model_mesh().get_tris_per_surf())
         
     return stats, data
     
     
+def collect_statistics_mpi(comm, my_core, root_set, display_options,
+                           session=None, exact=True):
+    """
+    Collects the statistics of collect_statistics with the work spread over
+    MPI ranks. Every rank loads the whole file, analyzes the triangles of
+    its own share of the surfaces and summarizes its own share of the
+    volumes, and the summaries (see StreamingSummary.merge) are reduced to
+    rank 0. The per-vertex sums are reduced to the ranks that own the
+    vertices (see distributed.reduce_vert_sums). The statistics match those
+    of the serial path up to floating point rounding.
+
+    inputs
+    ------
+    comm : an mpi4py communicator
+    my_core : a MOAB Core instance with the file loaded on every rank
+    root_set : the root set for a file
+    session : (optional) the AnalysisSession of the file. By default a new
+              session is created.
+    exact : (boolean) whether to compute the medians and percentiles exactly
+
+    outputs
+    -------
+    stats : a dictionary containing statistics for a variety of different
+            areas on rank 0, None on the other ranks
+    data : a dictionary with the data of the triangles per vertex and entity
+           statistics on rank 0, None on the other ranks
+    """
+
+    # only the MPI mode needs the distributed reductions, so they are not
+    # imported on startup
+    import distributed
+    from AnalysisSession import AnalysisSession
+
+    stats = {}
+    data = {}
+    is_root = comm.rank == 0
+
+    if session is None:
+        session = AnalysisSession(my_core, root_set)
+    dagmc_tags = session.dagmc_tags
+    native_ranges = session.native_ranges
+    entityset_ranges = session.entityset_ranges
+
+    if display_options['NR']:
+        stats['native_ranges'] = native_ranges
+
+    if display_options['ER']:
+        stats['entity_ranges'] = entityset_ranges
+
+    if display_options['SPV']:
+        volumes = list(entityset_ranges['Volumes'])[comm.rank::comm.size]
+        stats['S_P_V'] = distributed.summarize(
+            comm, [my_core.get_child_meshsets(volume).size()
+                   for volume in volumes], exact)
+
+    surfaces = list(entityset_ranges['Surfaces'])
+    tris_per_surf = np.array(
+        [my_core.get_entities_by_type(surface, types.MBTRI).size()
+         for surface in surfaces], dtype=np.int64)
+    surfs = distributed.get_rank_surfaces(tris_per_surf, comm)
+
+    if display_options['TPS'] or display_options['SPV']:
+        stats['T_P_S'] = distributed.summarize(comm, tris_per_surf[surfs],
+                                               exact)
+
+    if not any(display_options[key] for key in ['TPV', 'TAR', 'AT', 'C',
+                                                'R']):
+        mesh = None
+    else:
+        mesh = distributed.get_rank_mesh(my_core, surfaces, surfs,
+                                         threads=session.threads)
+
+    if display_options['TAR']:
+        stats['T_A_R'] = distributed.summarize(
+            comm, mesh.get_tri_geometry()['aspect_ratio'], exact)
+
+    if display_options['AT']:
+        stats['A_T'] = distributed.summarize(
+            comm, mesh.get_tri_geometry()['area'], exact)
+
+    if display_options['C']:
+        stats['C'] = distributed.summarize(
+            comm, mesh.get_tris_per_surf() / mesh.get_surf_area(), exact)
+
+    if display_options['TPV'] or display_options['R']:
+        # sum the per-vertex quantities of all the ranks on the owners of the
+        # vertices, since the vertices on surface seams are shared. Only the
+        # vertices of the triangles of each rank are sent, keyed by handle.
+        bounds = distributed.get_vert_bounds(native_ranges[types.MBVERTEX],
+                                             comm.size)
+        sums = [mesh.get_tris_per_vert()]
+        if display_options['R']:
+            sums.append(np.bincount(
+                np.ravel(mesh.conn),
+                weights=np.ravel(mesh.get_tri_geometry()['angles']),
+                minlength=mesh.num_verts))
+        owned_verts, owned_sums = distributed.reduce_vert_sums(
+            comm, bounds, mesh.vert_handles, sums)
+
+    if display_options['TPV']:
+        t_p_v_hist = distributed.reduce_hist(comm, np.bincount(owned_sums[0]))
+        if is_root:
+            if len(t_p_v_hist) > 0:
+                t_p_v_hist[0] = 0
+            data['T_P_V'] = t_p_v_hist
+            stats['T_P_V'] = get_hist_stats(t_p_v_hist)
+
+    if display_options['R']:
+        gc = np.abs(2 * np.pi - owned_sums[1])
+        stats['R'] = distributed.summarize(
+            comm, distributed.get_roughness(comm, bounds, mesh, owned_verts,
+                                            gc), exact)
+
+    if not is_root:
+        return None, None
+
+    if display_options['SPV_data']:
+        data['SPV_Entity'] = entity_specific_stats.get_spv_data(
+            my_core, entityset_ranges, dagmc_tags['global_id'])
+    if display_options['TPS_data']:
+        data['TPS_Entity'] = entity_specific_stats.get_tps_data(
+            my_core, entityset_ranges, dagmc_tags['global_id'],
+            tris_per_surf)
+
+    return stats, data
+
+
+def expand_filenames(patterns):
+    """
+    Expand the glob patterns among the file names given on the command line
+
+    inputs
+    ------
+    patterns : a list of file names and glob patterns
+
+    outputs
+    -------
+    filenames : a list of file names. Patterns that match no file are kept as
+                they are, so that their error is reported.
+    """
+    filenames = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        filenames.extend(matches if matches else [pattern])
+    return filenames
+
+
+def prefetch_file(filename):
+    """
+    Ask the kernel to start reading a file into the page cache in the
+    background, so that it is already in memory when a worker loads it
+
+    inputs
+    ------
+    filename : the name of the file
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(filename, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+def analyze_file(task):
+    """
+    Collect the statistics of one file in a batch worker process
+
+    inputs
+    ------
+    task : a (filename, display_options, exact, threads) tuple
+
+    outputs
+    -------
+    filename : the name of the file
+    stats_table : the statistics (see stats_output.get_stats_table), or None
+                  if the file could not be analyzed
+    entity_tables : the entity tables (see stats_output.get_entity_tables),
+                    or the error message if the file could not be analyzed
+    """
+    filename, display_options, exact, threads = task
+    from AnalysisSession import AnalysisSession
+    import stats_output
+
+    # any error is reported for this file only, so that one unreadable or
+    # malformed file does not stop the rest of the batch
+    try:
+        my_core = core.Core()
+        my_core.load_file(filename)
+        root_set = my_core.get_root_set()
+        session = AnalysisSession(my_core, root_set, threads=threads)
+        stats, data = collect_statistics(my_core, root_set, root_set,
+                                         display_options, session=session,
+                                         exact=exact)
+    except Exception as error:
+        return filename, None, str(error)
+    return (filename, stats_output.get_stats_table(stats),
+            stats_output.get_entity_tables(data))
+
+
+def run_batch(filenames, display_options, exact, output_format, output, jobs,
+              threads=1):
+    """
+    Collect the statistics of many files in a pool of worker processes and
+    write them to one combined output. The workers are reused across files,
+    and the files are prefetched into the page cache ahead of the workers.
+    The results are written in the order of filenames as they arrive.
+
+    inputs
+    ------
+    filenames : a list of file names
+    display_options : a dictionary with the statistics to collect
+    exact : (boolean) whether to compute the medians and percentiles exactly
+    output_format : 'jsonl' or 'csv'
+    output : name of the output file, or None for stdout
+    jobs : number of worker processes
+    threads : (optional) number of threads of the geometry kernels of each
+              worker process
+
+    outputs
+    -------
+    failed : number of files that could not be analyzed
+    """
+    # only batch mode needs multiprocessing, so it is not imported on startup
+    from multiprocessing import Pool
+    import stats_output
+
+    writer = stats_output.writers[output_format]
+    tasks = [(filename, display_options, exact, threads)
+             for filename in filenames]
+    # keep a window of files in the page cache: the ones being analyzed and
+    # the ones the workers will take next
+    window = 2 * jobs
+    written = 0
+    failed = 0
+    for filename in filenames[:window]:
+        prefetch_file(filename)
+    with stats_output.open_output(output) as out, Pool(jobs) as pool:
+        results = pool.imap(analyze_file, tasks)
+        for i, (filename, stats_table, entity_tables) in enumerate(results):
+            if i + window < len(filenames):
+                prefetch_file(filenames[i + window])
+            if stats_table is None:
+                warnings.warn('{} could not be analyzed: {}'.format(
+                    filename, entity_tables))
+                failed += 1
+                continue
+            # the csv blocks of the files are separated by an empty line
+            if output_format == 'csv' and written > 0:
+                out.write('\n')
+            writer(out, stats_table, entity_tables, filename=filename)
+            written += 1
+    return failed
+
+
 def main():
 
     # allows the user to input the file name into the command line
 
     parser = argparse.ArgumentParser() 
-    parser.add_argument("filename", help = "the file that you want read")
+    parser.add_argument("filename", nargs = "+", help = "the file(s) that you "
+                        "want read. Several files or glob patterns run in "
+                        "batch mode")
     parser.add_argument("-v", "--verbose", action = "store_true", help = "increase output verbosity") #optional verbosity setting
     parser.add_argument("--tps_data", action = "store_true", help = "display the triangles per surface raw data")
     parser.add_argument("--spv_data", action = "store_true", help = "display the surfaces per volume raw data")
@@ -240,9 +563,28 @@ def main():
                         help="display coarseness stats")
     parser.add_argument("--r", action="store_true",
                         help="display roughness stats")
+    parser.add_argument("--approximate", action="store_true",
+                        help="approximate the medians and percentiles to 1%% "
+                        "relative accuracy instead of computing them exactly")
+    parser.add_argument("--format",
+                        choices=["text", "json", "jsonl", "csv", "npz"],
+                        help="output format (default is text, or jsonl in "
+                        "batch mode)")
+    parser.add_argument("--output", help="file that the output is written to "
+                        "(default is stdout)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="number of worker processes in batch mode "
+                        "(default is the number of cores)")
+    parser.add_argument("--mpi", action="store_true",
+                        help="spread the analysis of a single file over the "
+                        "ranks of an MPI run, e.g. mpirun -n 4 (requires "
+                        "mpi4py)")
+    parser.add_argument("-t", "--threads", type=int, default=1,
+                        help="number of threads of the geometry kernels of "
+                        "each file (default is 1)")
     args = parser.parse_args() 
 
-    input_file = args.filename
+    input_files = expand_filenames(args.filename)
     verbose = args.verbose
     tps_data = args.tps_data
     spv_data = args.spv_data
@@ -253,6 +595,25 @@ def main():
         display_options = {'NR':True, 'ER':True, 'SPV':True, 'TPV':True, 'TPS':True,
                            'TAR':True, 'AT':True, 'C':True, 'R':True, 'TPS_data':False,
                            'SPV_data':False}
+    if args.mpi and (len(input_files) > 1 or args.jobs is not None):
+        parser.error('MPI mode analyzes a single file')
+    if args.mpi and args.tar_meshset is not None:
+        parser.error('--tar_meshset is not supported in MPI mode')
+    if len(input_files) > 1 or args.jobs is not None:
+        output_format = args.format or 'jsonl'
+        if output_format not in ['jsonl', 'csv']:
+            parser.error('batch mode writes jsonl or csv output')
+        if args.tar_meshset is not None:
+            parser.error('--tar_meshset is not supported in batch mode')
+        jobs = args.jobs or os.cpu_count() or 1
+        failed = run_batch(input_files, display_options, not args.approximate,
+                           output_format, args.output,
+                           min(jobs, len(input_files)), threads=args.threads)
+        if failed > 0:
+            sys.exit(1)
+        return
+
+    input_file = input_files[0]
     my_core = core.Core() #initiates core
     my_core.load_file(input_file) #loads the file
     root_set = my_core.get_root_set() #dumps all entities into the meshset to be redistributed to other meshsets
@@ -261,8 +622,30 @@ def main():
     if tar_meshset == None:
         tar_meshset = root_set
 
-    stats, data = collect_statistics(my_core, root_set, tar_meshset, display_options)
-    report_stats(stats, data, verbose, display_options)
+    from AnalysisSession import AnalysisSession
+    import stats_output
+
+    session = AnalysisSession(my_core, root_set, threads=args.threads)
+    if args.mpi:
+        from mpi4py import MPI
+        stats, data = collect_statistics_mpi(MPI.COMM_WORLD, my_core,
+                                             root_set, display_options,
+                                             session=session,
+                                             exact=not args.approximate)
+        if stats is None:
+            # only rank 0 reports the statistics
+            return
+    else:
+        stats, data = collect_statistics(my_core, root_set, tar_meshset,
+                                         display_options, session=session,
+                                         exact=not args.approximate)
+    if args.format not in [None, 'text']:
+        stats_output.write_stats(stats, data, args.format, args.output)
+    elif args.output is not None:
+        with open(args.output, 'w') as out, redirect_stdout(out):
+            report_stats(stats, data, verbose, display_options)
+    else:
+        report_stats(stats, data, verbose, display_options)
 
 if __name__ == "__main__":
     main()
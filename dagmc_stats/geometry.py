@@ -0,0 +1,444 @@
+import numpy as np
+
+# number of rows (triangles, corners or edges) per chunk of the threaded
+# kernels. The temporaries of a chunk of triangle geometry take a few MB, so
+# each thread works within its share of the cache.
+CHUNK_SIZE = 16384
+
+
+def map_chunks(func, num_rows, threads, chunk_size=None):
+    """
+    Call a function on consecutive chunks of rows in a pool of threads. The
+    NumPy operations on large arrays release the GIL, so the chunks run
+    concurrently.
+
+    inputs
+    ------
+    func : function of (start, stop) that processes rows start:stop
+    num_rows : number of rows
+    threads : number of threads
+    chunk_size : (optional) number of rows per chunk. By default
+                 CHUNK_SIZE.
+
+    outputs
+    -------
+    results : list of the results of func, in chunk order
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+    starts = range(0, num_rows, chunk_size)
+    with ThreadPoolExecutor(threads) as executor:
+        return list(executor.map(
+            lambda start: func(start, min(start + chunk_size, num_rows)),
+            starts))
+
+
+def bincount(index, weights=None, minlength=0, threads=1):
+    """
+    np.bincount, accumulated in a pool of threads. The index is split into
+    one contiguous block per thread, each block is counted into a partial
+    array of its own (of the length of the output, so there are as few of
+    them as possible) and the partial arrays are summed. Weighted sums may
+    differ from the single pass ones by rounding.
+
+    inputs
+    ------
+    index : (N,) non-negative integer array
+    weights : (optional) (N,) float array aligned with index
+    minlength : minimum length of the output
+    threads : number of threads. With one thread np.bincount is called
+              directly.
+
+    outputs
+    -------
+    counts : the (weighted) count of each index value
+    """
+    index = np.ravel(index)
+    if weights is not None:
+        weights = np.ravel(weights)
+    if threads <= 1 or len(index) <= CHUNK_SIZE:
+        return np.bincount(index, weights=weights, minlength=minlength)
+    minlength = max(minlength, int(index.max()) + 1)
+
+    def count_block(start, stop):
+        return np.bincount(index[start:stop], minlength=minlength,
+                           weights=None if weights is None
+                           else weights[start:stop])
+
+    block_size = -(-len(index) // threads)
+    partials = map_chunks(count_block, len(index), threads,
+                          chunk_size=block_size)
+    counts = partials[0]
+    for partial in partials[1:]:
+        counts += partial
+    return counts
+
+
+def tri_side_lengths(coords, conn):
+    """
+    Get the side lengths of all the triangles in one vectorized pass
+
+    inputs
+    ------
+    coords : (V, 3) float array of vertex coordinates
+    conn : (T, 3) integer array of triangle connectivity, given as row
+           indices into coords
+
+    outputs
+    -------
+    side_lengths : (T, 3) float array where column k holds the length of the
+                   side opposite to corner k of each triangle
+    """
+    corners = coords[conn]
+    # rolling the corner axis pairs corner k with the two corners (k+1, k+2)
+    # that define the side opposite to it:
+    #    k     k+1    k+2
+    #    0      1      2
+    #    1      2      0
+    #    2      0      1
+    return np.linalg.norm(np.roll(corners, -1, axis=1) -
+                          np.roll(corners, -2, axis=1), axis=2)
+
+
+tri_geom_struct = np.dtype({'names': ['side_lengths', 'angles', 'area',
+                                      'aspect_ratio'],
+                            'formats': [(np.float64, (3,)), (np.float64, (3,)),
+                                        np.float64, np.float64]})
+
+
+def tri_geometry(coords, conn, threads=1):
+    """
+    Get all the per-triangle geometric quantities in a single fused pass over
+    the side lengths
+
+    inputs
+    ------
+    coords : (V, 3) float array of vertex coordinates
+    conn : (T, 3) integer array of triangle connectivity, given as row
+           indices into coords
+    threads : number of threads. The triangles are processed in chunks that
+              run concurrently, and every triangle gets the same values as
+              in a single pass.
+
+    outputs
+    -------
+    tri_geom : a numpy structured array of length T (see tri_geom_struct) with
+               the columns
+               side_lengths : side opposite to each of the three corners
+               angles : interior angle at each of the three corners
+               area : triangle area (according to the Heron's formula:
+                      sqrt(s(s - a)(s - b)(s - c)), where s = (a + b + c)/2)
+               aspect_ratio : triangle aspect ratio (according to the
+                              equation: (abc)/(8(s-a)(s-b)(s-c)))
+    """
+    tri_geom = np.zeros(len(conn), dtype=tri_geom_struct)
+    if threads > 1 and len(conn) > CHUNK_SIZE:
+        def compute_chunk(start, stop):
+            tri_geom[start:stop] = tri_geometry(coords, conn[start:stop])
+
+        map_chunks(compute_chunk, len(conn), threads)
+        return tri_geom
+    side_lengths = tri_side_lengths(coords, conn)
+    s = 0.5 * side_lengths.sum(axis=1)
+    s_diff_prod = np.prod(s[:, np.newaxis] - side_lengths, axis=1)
+    side_length_prod = np.prod(side_lengths, axis=1)
+    side_length_sq = side_lengths**2
+    side_length_sum_sq_half = side_length_sq.sum(axis=1) / 2.
+    # law of cosines, (b^2 + c^2 - a^2) / 2bc, written in terms of the
+    # quantities shared by all three corners
+    cos_angles = (side_length_sum_sq_half[:, np.newaxis] - side_length_sq) * \
+        side_lengths / side_length_prod[:, np.newaxis]
+    tri_geom['side_lengths'] = side_lengths
+    tri_geom['angles'] = np.arccos(np.clip(cos_angles, -1., 1.))
+    tri_geom['area'] = np.sqrt(s * s_diff_prod)
+    tri_geom['aspect_ratio'] = side_length_prod / (8 * s_diff_prod)
+    return tri_geom
+
+
+def gaussian_curvature(vert_index, angles, num_verts, threads=1):
+    """
+    Get the gaussian curvature values of all the vertices with one
+    accumulation of the triangle corner angles onto their vertices
+    Reference: https://www.sciencedirect.com/science/article/pii/
+    S0097849312001203
+    Formula 1
+
+    inputs
+    ------
+    vert_index : integer array with the dense vertex index of each triangle
+                 corner (e.g. the raveled connectivity)
+    angles : float array with the angle at each triangle corner, aligned with
+             vert_index
+    num_verts : number of vertices
+    threads : number of threads of the accumulation (see bincount)
+
+    outputs
+    -------
+    gc : (num_verts,) float array of gaussian curvature values
+    """
+    sum_alpha_angles = bincount(vert_index, weights=angles,
+                                minlength=num_verts, threads=threads)
+    return np.abs(2 * np.pi - sum_alpha_angles)
+
+
+def edge_cotangents(conn, angles, threads=1):
+    """
+    Get the cotangent of the angle opposite to each edge of each triangle,
+    with every edge in both directions
+
+    inputs
+    ------
+    conn : (T, 3) integer array of triangle connectivity, given as vertex
+           indices
+    angles : (T, 3) float array with the angle at each triangle corner
+    threads : number of threads. The triangles are processed in chunks that
+              run concurrently.
+
+    outputs
+    -------
+    rows : (6T,) vertex index i of each directed edge (i, j)
+    cols : (6T,) vertex index j of each directed edge (i, j)
+    cot : (6T,) cotangent of the angle opposite to the edge in its triangle
+    """
+    num_tris = len(conn)
+    rows = np.empty(6 * num_tris, dtype=np.int64)
+    cols = np.empty(6 * num_tris, dtype=np.int64)
+    cot = np.empty(6 * num_tris)
+
+    def compute_chunk(start, stop):
+        # the edge opposite to corner k joins corners k+1 and k+2
+        vert_i = np.roll(conn[start:stop], -1, axis=1).ravel()
+        vert_j = np.roll(conn[start:stop], -2, axis=1).ravel()
+        chunk_cot = 1. / np.tan(np.ravel(angles[start:stop]))
+        forward = slice(3 * start, 3 * stop)
+        backward = slice(3 * (num_tris + start), 3 * (num_tris + stop))
+        rows[forward], cols[forward], cot[forward] = vert_i, vert_j, chunk_cot
+        rows[backward], cols[backward], cot[backward] = \
+            vert_j, vert_i, chunk_cot
+
+    if threads > 1 and num_tris > CHUNK_SIZE:
+        map_chunks(compute_chunk, num_tris, threads)
+    else:
+        compute_chunk(0, num_tris)
+    return rows, cols, cot
+
+
+def edge_weights(edge_keys, cot, num_verts):
+    """
+    Average the cotangents of the directed edges that join the same pair of
+    vertices
+
+    inputs
+    ------
+    edge_keys : integer array with the key i * num_verts + j of each directed
+                edge (i, j)
+    cot : float array with the cotangent of each directed edge (see
+          edge_cotangents), aligned with edge_keys
+    num_verts : number of vertices
+
+    outputs
+    -------
+    rows : vertex index i of each distinct edge, sorted
+    cols : vertex index j of each distinct edge, sorted within each row
+    weights : the average of the cotangents of each distinct edge
+    """
+    edge_keys, edge_index, edge_count = np.unique(edge_keys,
+                                                  return_inverse=True,
+                                                  return_counts=True)
+    weights = np.bincount(np.ravel(edge_index), weights=cot,
+                          minlength=len(edge_keys)) / edge_count
+    return edge_keys // num_verts, edge_keys % num_verts, weights
+
+
+def cotangent_weights(conn, angles, num_verts, threads=1):
+    """
+    Assemble the cotangent weights D_ij of all the edges as a sparse
+    num_verts x num_verts matrix in coordinate (row, col, weight) form
+    Reference: https://www.sciencedirect.com/science/article/pii/
+    S0097849312001203
+    Formula 3
+
+    inputs
+    ------
+    conn : (T, 3) integer array of triangle connectivity, given as dense
+           vertex indices
+    angles : (T, 3) float array with the angle at each triangle corner
+    num_verts : number of vertices
+    threads : number of threads. The directed edges are bucketed by row into
+              one block of vertices per thread, with balanced edge counts,
+              and the blocks are sorted and summed concurrently. The buckets
+              keep the edge order, so the weights are identical to those of
+              a single pass. Only the bucketing itself, a linear radix sort,
+              runs in the calling thread.
+
+    outputs
+    -------
+    rows : vertex index i of each nonzero entry, sorted
+    cols : vertex index j of each nonzero entry, sorted within each row
+    weights : D_ij, the average of the cotangents of the angles opposite to
+              the edge (i, j) in the triangles that share it
+    """
+    # D is symmetric, so every edge is stored in both directions
+    rows, cols, cot = edge_cotangents(conn, angles, threads=threads)
+    num_edges = len(rows)
+    if threads <= 1 or num_edges <= CHUNK_SIZE:
+        return edge_weights(rows * num_verts + cols, cot, num_verts)
+    # contiguous blocks of vertices with balanced numbers of edges, so that
+    # the rows of the blocks follow each other in sorted order
+    cum_edges = np.cumsum(bincount(rows, minlength=num_verts,
+                                   threads=threads))
+    bounds = np.unique(np.concatenate(
+        [[0], np.searchsorted(cum_edges,
+                              cum_edges[-1] * np.arange(1, threads) / threads),
+         [num_verts]]))
+    num_blocks = len(bounds) - 1
+    offsets = np.concatenate([[0], cum_edges[bounds[1:] - 1]])
+    block_of_vert = np.repeat(
+        np.arange(num_blocks, dtype=np.min_scalar_type(num_blocks)),
+        np.diff(bounds))
+    edge_keys = np.empty(num_edges, dtype=np.int64)
+    edge_blocks = np.empty(num_edges, dtype=block_of_vert.dtype)
+
+    def key_chunk(start, stop):
+        edge_keys[start:stop] = rows[start:stop] * num_verts + cols[start:stop]
+        edge_blocks[start:stop] = block_of_vert[rows[start:stop]]
+
+    map_chunks(key_chunk, num_edges, threads)
+    # a stable sort of 8 or 16 bit keys is a radix sort
+    order = np.argsort(edge_blocks, kind='stable')
+    bucket_keys = np.empty_like(edge_keys)
+    bucket_cot = np.empty_like(cot)
+
+    def gather_chunk(start, stop):
+        bucket_keys[start:stop] = edge_keys[order[start:stop]]
+        bucket_cot[start:stop] = cot[order[start:stop]]
+
+    map_chunks(gather_chunk, num_edges, threads)
+
+    def sum_block(block, _):
+        start, stop = offsets[block], offsets[block + 1]
+        return edge_weights(bucket_keys[start:stop], bucket_cot[start:stop],
+                            num_verts)
+
+    blocks = map_chunks(sum_block, num_blocks, threads, chunk_size=1)
+    return tuple(np.concatenate(column) for column in zip(*blocks))
+
+
+def local_roughness(gc, rows, cols, weights, threads=1):
+    """
+    Get the local roughness values of all the vertices as a single sparse
+    matrix-vector product of the cotangent weights and the gaussian curvature
+    Reference: https://www.sciencedirect.com/science/article/pii/
+    S0097849312001203
+    Formula 2
+
+    inputs
+    ------
+    gc : (V,) float array of gaussian curvature values
+    rows, cols, weights : the cotangent weights in coordinate form (see
+                          cotangent_weights)
+    threads : number of threads of the accumulation (see bincount)
+
+    outputs
+    -------
+    lri : (V,) float array of local roughness values. Vertices that are not
+          connected to any triangle get NaN.
+    """
+    num_verts = len(gc)
+    dij_gc_sum = bincount(rows, weights=weights * gc[cols],
+                          minlength=num_verts, threads=threads)
+    dii_sum = bincount(rows, weights=weights, minlength=num_verts,
+                       threads=threads)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lri = np.abs(gc - dij_gc_sum / dii_sum)
+    return lri
+
+
+def vert_tri_adjacency(conn, num_verts):
+    """
+    Invert the triangle connectivity into a compressed sparse row index of
+    the triangles adjacent to each vertex
+
+    inputs
+    ------
+    conn : (T, 3) integer array of triangle connectivity, given as dense
+           vertex indices
+    num_verts : number of vertices
+
+    outputs
+    -------
+    indptr : (num_verts + 1,) integer array. The triangles adjacent to vertex
+             v are indices[indptr[v]:indptr[v + 1]], and the triangles
+             adjacent to a block of vertices start:stop are
+             indices[indptr[start]:indptr[stop]]
+    indices : (3T,) integer array of triangle indices, grouped by vertex and
+              sorted within each group
+    """
+    flat_conn = np.ravel(conn)
+    indptr = np.zeros(num_verts + 1, dtype=np.int64)
+    np.cumsum(np.bincount(flat_conn, minlength=num_verts), out=indptr[1:])
+    # a stable sort keeps the triangle order within each vertex group
+    indices = np.argsort(flat_conn, kind='stable') // 3
+    return indptr, indices
+
+
+def segment_sum(values, offsets):
+    """
+    Sum the values of contiguous segments in one reduction
+
+    inputs
+    ------
+    values : (N,) float array
+    offsets : (S + 1,) integer array. Segment s holds
+              values[offsets[s]:offsets[s + 1]]
+
+    outputs
+    -------
+    sums : (S,) float array with the sum of each segment. Empty segments sum
+           to zero.
+    """
+    num_segments = len(offsets) - 1
+    segment_ids = np.repeat(np.arange(num_segments), np.diff(offsets))
+    return np.bincount(segment_ids, weights=values, minlength=num_segments)
+
+
+def vert_area(conn, tri_area, num_verts, threads=1):
+    """
+    Get the total area of the triangles adjacent to each vertex by scattering
+    the triangle areas onto their corners
+
+    inputs
+    ------
+    conn : (T, 3) integer array of triangle connectivity, given as dense
+           vertex indices
+    tri_area : (T,) float array of triangle areas
+    num_verts : number of vertices
+    threads : number of threads of the accumulation (see bincount)
+
+    outputs
+    -------
+    area : (num_verts,) float array of adjacent triangle areas
+    """
+    return bincount(conn, weights=np.repeat(tri_area, 3),
+                    minlength=num_verts, threads=threads)
+
+
+def tris_per_vert(conn, num_verts, threads=1):
+    """
+    Get the number of triangles adjacent to each vertex by counting the
+    occurrences of the vertices in the triangle connectivity
+
+    inputs
+    ------
+    conn : (T, 3) integer array of triangle connectivity, given as dense
+           vertex indices
+    num_verts : number of vertices
+    threads : number of threads of the accumulation (see bincount)
+
+    outputs
+    -------
+    t_p_v : (num_verts,) integer array of triangle valences
+    """
+    return bincount(conn, minlength=num_verts, threads=threads)
@@ -0,0 +1,322 @@
+import heapq
+from multiprocessing import Pool
+
+import numpy as np
+
+try:
+    from . import geometry
+    from .SharedArrays import SharedArrays, attach, shared_memory
+    from .TriangleMesh import TriangleMesh
+except ImportError:
+    # imported as a top level module by distributed.py
+    import geometry
+    from SharedArrays import SharedArrays, attach, shared_memory
+    from TriangleMesh import TriangleMesh
+
+
+def get_shards(tris_per_surf, num_shards):
+    """
+    Split the surfaces into shards with balanced triangle counts. The
+    surfaces are assigned from the largest to the smallest to the shard with
+    the fewest triangles so far (longest processing time first), with ties
+    broken by index so that the split is deterministic.
+
+    inputs
+    ------
+    tris_per_surf : integer array with the number of triangles of each surface
+    num_shards : maximum number of shards
+
+    outputs
+    -------
+    shards : list of sorted integer arrays of surface indices. Empty shards
+             are dropped.
+    """
+    num_shards = max(1, min(num_shards, len(tris_per_surf)))
+    loads = [(0, shard) for shard in range(num_shards)]
+    assignment = np.zeros(len(tris_per_surf), dtype=np.int64)
+    order = np.argsort(-np.asarray(tris_per_surf), kind='stable')
+    for surf in order:
+        load, shard = heapq.heappop(loads)
+        assignment[surf] = shard
+        heapq.heappush(loads, (load + tris_per_surf[surf], shard))
+    shards = [np.flatnonzero(assignment == shard)
+              for shard in range(num_shards)]
+    return [shard for shard in shards if len(shard) > 0]
+
+
+def get_shard_tris(surf_offsets, surfs):
+    """
+    Get the triangle rows of a set of surfaces
+
+    inputs
+    ------
+    surf_offsets : boundaries of the surface segments of a mesh
+    surfs : sorted integer array of surface indices
+
+    outputs
+    -------
+    shard_offsets : boundaries of the surface segments of the shard
+    tri_index : integer array of the rows of the shard triangles in the mesh
+    """
+    starts = surf_offsets[surfs]
+    counts = surf_offsets[surfs + 1] - starts
+    shard_offsets = np.zeros(len(surfs) + 1, dtype=np.int64)
+    np.cumsum(counts, out=shard_offsets[1:])
+    # consecutive triangle rows within each surface segment
+    tri_index = np.arange(shard_offsets[-1]) + \
+        np.repeat(starts - shard_offsets[:-1], counts)
+    return shard_offsets, tri_index
+
+
+# shared arrays of the pool that the worker process belongs to, mapped once
+# per worker by attach_worker
+_worker_arrays = {}
+_worker_blocks = []
+
+
+def attach_worker(descriptor, writable):
+    """
+    Map the shared mesh and result arrays in a worker process (the pool
+    initializer). The mesh arrays are read-only; only the result arrays can
+    be written to.
+
+    inputs
+    ------
+    descriptor : descriptor of a SharedArrays instance
+    writable : names of the result arrays
+
+    outputs
+    -------
+    none
+    """
+    arrays, blocks = attach(descriptor, writable=writable)
+    _worker_arrays.update(arrays)
+    _worker_blocks.extend(blocks)
+
+
+def compute_shard(surfs):
+    """
+    Compute the per-triangle geometry and the surface areas of a shard in a
+    worker process. The mesh is read through the shared arrays (see
+    attach_worker), and the results are written straight to their rows of
+    the shared result arrays, so neither is copied between processes.
+
+    inputs
+    ------
+    surfs : sorted integer array of the surface indices of the shard
+
+    outputs
+    -------
+    none
+    """
+    shard_offsets, tri_index = get_shard_tris(_worker_arrays['surf_offsets'],
+                                              surfs)
+    mesh = TriangleMesh(_worker_arrays['coords'],
+                        _worker_arrays['conn'][tri_index],
+                        surf_offsets=shard_offsets)
+    _worker_arrays['tri_geometry'][tri_index] = mesh.get_tri_geometry()
+    _worker_arrays['surf_area'][surfs] = mesh.get_surf_area()
+
+
+def compute_surface_shards(mesh, workers):
+    """
+    Compute the triangle geometry and the surface areas of a mesh in a pool
+    of worker processes, one load-balanced shard of surfaces per task, and
+    store them in the mesh cache. The coordinates, connectivity and surface
+    offsets are exported once to shared memory (see SharedArrays) that every
+    worker maps read-only, so the memory use stays close to one copy of the
+    model whatever the number of workers. Every triangle and every surface
+    is computed by exactly the same operations as in a single process, so
+    the cached arrays are identical to those of a serial run.
+
+    inputs
+    ------
+    mesh : TriangleMesh instance
+    workers : number of worker processes
+
+    outputs
+    -------
+    none
+    """
+    shards = get_shards(mesh.get_tris_per_surf(), workers)
+    if len(shards) == 0:
+        return
+    with SharedArrays.from_mesh(mesh) as shared:
+        shared.empty('tri_geometry', (mesh.num_tris,),
+                     geometry.tri_geom_struct)
+        shared.empty('surf_area', (len(mesh.surf_offsets) - 1,), np.float64)
+        with Pool(min(workers, len(shards)), initializer=attach_worker,
+                  initargs=(shared.descriptor,
+                            ('tri_geometry', 'surf_area'))) as pool:
+            pool.map(compute_shard, shards)
+        # copy the results out before the shared memory is removed
+        mesh.store('tri_geometry', shared['tri_geometry'].copy())
+        mesh.store('surf_area', shared['surf_area'].copy())
+
+
+def get_vert_blocks(tris_per_vert, num_blocks):
+    """
+    Split the vertices into contiguous blocks with balanced numbers of
+    adjacent triangles
+
+    inputs
+    ------
+    tris_per_vert : integer array with the number of triangles adjacent to
+                    each vertex
+    num_blocks : maximum number of blocks
+
+    outputs
+    -------
+    bounds : sorted integer array of block boundaries. Block b owns the
+             vertices bounds[b]:bounds[b + 1]. Empty blocks are dropped.
+    """
+    num_verts = len(tris_per_vert)
+    num_blocks = max(1, min(num_blocks, num_verts))
+    cum_tris = np.cumsum(tris_per_vert)
+    targets = cum_tris[-1] * np.arange(1, num_blocks) / num_blocks \
+        if num_verts > 0 else []
+    bounds = np.concatenate([[0], np.searchsorted(cum_tris, targets),
+                             [num_verts]])
+    return np.unique(bounds)
+
+
+def get_halos(vert_tri_adjacency, bounds):
+    """
+    Get the one-ring halo of each block of vertices, i.e. all the triangles
+    adjacent to at least one vertex of the block. The triangles adjacent to
+    a block are one contiguous slice of the vertex->triangle index, so each
+    halo costs time in proportion to its own size.
+
+    inputs
+    ------
+    vert_tri_adjacency : the CSR vertex->triangle index of the mesh (see
+                         geometry.vert_tri_adjacency)
+    bounds : sorted integer array of block boundaries (see get_vert_blocks)
+
+    outputs
+    -------
+    halos : integer array of the sorted triangle rows of every halo, one
+            block after the other
+    halo_offsets : (len(bounds),) integer array. The halo of block b is
+                   halos[halo_offsets[b]:halo_offsets[b + 1]]
+    """
+    indptr, indices = vert_tri_adjacency
+    halos = [np.unique(indices[indptr[start]:indptr[stop]])
+             for start, stop in zip(bounds[:-1], bounds[1:])]
+    halo_offsets = np.zeros(len(halos) + 1, dtype=np.int64)
+    np.cumsum([len(halo) for halo in halos], out=halo_offsets[1:])
+    if len(halos) == 0:
+        return np.zeros(0, dtype=np.int64), halo_offsets
+    return np.concatenate(halos), halo_offsets
+
+
+def compute_block_curvature(block):
+    """
+    Compute the gaussian curvature of the vertices owned by a block in a
+    worker process (the first phase of compute_roughness_partitions). The
+    angles of the halo triangles are accumulated in the same order as in
+    geometry.gaussian_curvature over the whole mesh, so the values are
+    identical.
+
+    inputs
+    ------
+    block : a (start, stop, halo_start, halo_stop) tuple of the owned
+            vertices and of the slice of the shared halos of the block
+
+    outputs
+    -------
+    none
+    """
+    start, stop, halo_start, halo_stop = block
+    conn = _worker_arrays['conn']
+    halo = _worker_arrays['halos'][halo_start:halo_stop]
+    vert_index = np.ravel(conn[halo])
+    angles = np.ravel(_worker_arrays['angles'][halo])
+    owned = (vert_index >= start) & (vert_index < stop)
+    _worker_arrays['gaussian_curvature'][start:stop] = \
+        geometry.gaussian_curvature(vert_index[owned] - start,
+                                    angles[owned], stop - start)
+
+
+def compute_block_roughness(block):
+    """
+    Compute the local roughness of the vertices owned by a block in a worker
+    process (the second phase of compute_roughness_partitions), from the
+    cotangent weights of the halo triangles and the gaussian curvature of
+    the first phase. The halo holds every edge of the owned vertices and
+    its vertices keep their relative order, so the values are identical to
+    those of geometry.local_roughness over the whole mesh.
+
+    inputs
+    ------
+    block : a (start, stop, halo_start, halo_stop) tuple of the owned
+            vertices and of the slice of the shared halos of the block
+
+    outputs
+    -------
+    none
+    """
+    start, stop, halo_start, halo_stop = block
+    conn = _worker_arrays['conn']
+    halo = _worker_arrays['halos'][halo_start:halo_stop]
+    verts, halo_conn = np.unique(conn[halo], return_inverse=True)
+    halo_conn = halo_conn.reshape(-1, 3)
+    rows, cols, weights = geometry.cotangent_weights(
+        halo_conn, _worker_arrays['angles'][halo], len(verts))
+    lri = geometry.local_roughness(
+        _worker_arrays['gaussian_curvature'][verts], rows, cols, weights)
+    # the halo vertices outside of the block miss some of their edges
+    owned = (verts >= start) & (verts < stop)
+    roughness = _worker_arrays['roughness']
+    roughness[start:stop] = np.nan
+    roughness[verts[owned]] = lri[owned]
+
+
+def compute_roughness_partitions(mesh, workers):
+    """
+    Compute the gaussian curvature and the local roughness of a mesh in a
+    pool of worker processes and store them in the mesh cache. The vertices
+    are split into contiguous blocks with balanced triangle counts, and each
+    worker takes a block of owned vertices plus the one-ring halo of the
+    triangles around them, so that the results do not depend on surface or
+    block seams. The roughness of a vertex needs the curvature of its
+    neighbors, so the curvature of all the blocks is computed in a first
+    phase and shared before the roughness phase. The halos are found once,
+    in this process, from the vertex->triangle index of the mesh (see
+    get_halos), so that every worker only touches the triangles of its own
+    block. The mesh connectivity, triangle angles and halos are shared with
+    the workers (see SharedArrays), and the stored arrays are identical to
+    those of a single process run.
+
+    inputs
+    ------
+    mesh : TriangleMesh instance
+    workers : number of worker processes
+
+    outputs
+    -------
+    none
+    """
+    bounds = get_vert_blocks(mesh.get_tris_per_vert(), workers)
+    if len(bounds) < 2:
+        return
+    adjacency_cached = mesh.is_cached('vert_tri_adjacency')
+    halos, halo_offsets = get_halos(mesh.get_vert_tri_adjacency(), bounds)
+    # only the halos are needed from here on
+    if not adjacency_cached:
+        mesh.release('vert_tri_adjacency')
+    blocks = list(zip(bounds[:-1].tolist(), bounds[1:].tolist(),
+                      halo_offsets[:-1].tolist(), halo_offsets[1:].tolist()))
+    with SharedArrays({'conn': mesh.conn,
+                       'angles': mesh.get_tri_geometry()['angles'],
+                       'halos': halos}) as shared:
+        shared.empty('gaussian_curvature', (mesh.num_verts,), np.float64)
+        shared.empty('roughness', (mesh.num_verts,), np.float64)
+        with Pool(min(workers, len(blocks)), initializer=attach_worker,
+                  initargs=(shared.descriptor,
+                            ('gaussian_curvature', 'roughness'))) as pool:
+            pool.map(compute_block_curvature, blocks)
+            pool.map(compute_block_roughness, blocks)
+        # copy the results out before the shared memory is removed
+        mesh.store('gaussian_curvature', shared['gaussian_curvature'].copy())
+        mesh.store('roughness', shared['roughness'].copy())
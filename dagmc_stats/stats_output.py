@@ -0,0 +1,316 @@
+import json
+import sys
+from contextlib import contextmanager
+from itertools import chain
+
+import numpy as np
+
+# number of table rows formatted and written at a time
+CHUNK_SIZE = 65536
+
+# buffer size of the output files
+BUFFER_SIZE = 1 << 20
+
+# the statistics table of the npz output
+stats_struct = np.dtype({'names': ['name', 'key', 'value'],
+                         'formats': ['U32', 'U32', np.float64]})
+
+
+def get_stats_table(stats):
+    """
+    Flatten the statistics into a table with one (name, key, value) row per
+    value. The native and entityset ranges are reported as entity counts.
+    The values are Python ints and floats, so that integer statistics stay
+    integers in the text formats.
+
+    inputs
+    ------
+    stats : a dictionary with information about certain statistics for a model
+            (see generate_stats.collect_statistics)
+
+    outputs
+    -------
+    stats_table : a list of (name, key, value) tuples
+    """
+    rows = []
+    for name, statistics in stats.items():
+        for key, value in statistics.items():
+            if name in ['native_ranges', 'entity_ranges']:
+                value = value.size()
+            if isinstance(value, np.generic):
+                value = value.item()
+            rows.append((name, str(key), value))
+    return rows
+
+
+def get_json_value(value):
+    """
+    Get a statistic value that JSON can represent. The statistics of an
+    empty dataset are NaN, which JSON has no literal for, so the non-finite
+    values are written as null.
+
+    inputs
+    ------
+    value : a statistic value (see get_stats_table)
+
+    outputs
+    -------
+    json_value : value, or None if it is a non-finite float
+    """
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+def get_entity_tables(data):
+    """
+    Get the entity tables (surfaces per volume and triangles per surface
+    with global ids) that were collected
+
+    inputs
+    ------
+    data : a dictionary with the data for each statistical area (see
+           generate_stats.collect_statistics)
+
+    outputs
+    -------
+    entity_tables : a dictionary of numpy structured arrays by table name
+    """
+    return {name: data[name] for name in ['SPV_Entity', 'TPS_Entity']
+            if name in data}
+
+
+def get_field_format(dtype):
+    """
+    Get the printf style format of the values of a field
+
+    inputs
+    ------
+    dtype : numpy dtype of the field
+
+    outputs
+    -------
+    field_format : format string
+    """
+    if np.issubdtype(dtype, np.integer):
+        return '%d'
+    return '%.17g'
+
+
+def escape(text):
+    """
+    Escape a literal text for use in a printf style format
+
+    inputs
+    ------
+    text : literal text
+
+    outputs
+    -------
+    escaped_text : text with every % doubled
+    """
+    return text.replace('%', '%%')
+
+
+def write_rows(out, row_format, table, sep=''):
+    """
+    Write the rows of a structured array in chunks. The values of each chunk
+    are formatted with a single string operation and written with a single
+    write call, so that no string is built per row.
+
+    inputs
+    ------
+    out : a text file object
+    row_format : printf style format of one row, with one conversion per
+                 field of table
+    table : a numpy structured array
+    sep : separator written between the rows
+
+    outputs
+    -------
+    none
+    """
+    for start in range(0, len(table), CHUNK_SIZE):
+        chunk = table[start:start + CHUNK_SIZE]
+        if start > 0:
+            out.write(sep)
+        values = tuple(chain.from_iterable(chunk.tolist()))
+        out.write(sep.join([row_format] * len(chunk)) % values)
+
+
+def write_json(out, stats_table, entity_tables):
+    """
+    Write the statistics and entity tables as one JSON document in the form
+    {"stats": {name: {key: value}}, table name: {column: [values]}}
+
+    inputs
+    ------
+    out : a text file object
+    stats_table : the statistics (see get_stats_table)
+    entity_tables : the entity tables (see get_entity_tables)
+
+    outputs
+    -------
+    none
+    """
+    stats = {}
+    for name, key, value in stats_table:
+        stats.setdefault(name, {})[key] = get_json_value(value)
+    out.write('{"stats": ')
+    json.dump(stats, out, allow_nan=False)
+    for table_name, table in entity_tables.items():
+        out.write(', ' + json.dumps(table_name) + ': {')
+        for i, column in enumerate(table.dtype.names):
+            if i > 0:
+                out.write(', ')
+            out.write(json.dumps(column) + ': [')
+            column_table = table[[column]]
+            write_rows(out, get_field_format(table.dtype[column]),
+                       column_table, sep=', ')
+            out.write(']')
+        out.write('}')
+    out.write('}\n')
+
+
+def write_jsonl(out, stats_table, entity_tables, filename=None):
+    """
+    Write the statistics and entity tables as JSON lines, one object per
+    statistic value and per entity row. Each object has a "table" member
+    that names the table it belongs to.
+
+    inputs
+    ------
+    out : a text file object
+    stats_table : the statistics (see get_stats_table)
+    entity_tables : the entity tables (see get_entity_tables)
+    filename : (optional) name of the model file. If it is given, every
+               object gets a "file" member, so that the output of several
+               files can be combined.
+
+    outputs
+    -------
+    none
+    """
+    file_member = {} if filename is None else {'file': filename}
+    for name, key, value in stats_table:
+        record = {'table': 'stats'}
+        record.update(file_member)
+        record.update({'name': name, 'key': key,
+                       'value': get_json_value(value)})
+        out.write(json.dumps(record, allow_nan=False) + '\n')
+    for table_name, table in entity_tables.items():
+        members = [json.dumps(key) + ': ' + escape(json.dumps(value))
+                   for key, value in file_member.items()]
+        members.extend(json.dumps(column) + ': ' +
+                       get_field_format(table.dtype[column])
+                       for column in table.dtype.names)
+        row_format = '{"table": ' + json.dumps(table_name) + ', ' + \
+            ', '.join(members) + '}\n'
+        write_rows(out, row_format, table)
+
+
+def write_csv(out, stats_table, entity_tables, filename=None):
+    """
+    Write the statistics and entity tables as CSV blocks separated by an
+    empty line. Each block starts with a header line, and the statistics
+    block has one name,key,value row per statistic value.
+
+    inputs
+    ------
+    out : a text file object
+    stats_table : the statistics (see get_stats_table)
+    entity_tables : the entity tables (see get_entity_tables)
+    filename : (optional) name of the model file. If it is given, every
+               block gets a leading quoted "file" column, so that the output
+               of several files can be combined.
+
+    outputs
+    -------
+    none
+    """
+    if filename is None:
+        file_header = ''
+        file_column = ''
+    else:
+        file_header = 'file,'
+        file_column = '"' + filename.replace('"', '""') + '",'
+    out.write(file_header + ','.join(stats_struct.names) + '\n')
+    for name, key, value in stats_table:
+        out.write('{}{},{},{!r}\n'.format(file_column, name, key, value))
+    for table in entity_tables.values():
+        out.write('\n' + file_header + ','.join(table.dtype.names) + '\n')
+        row_format = escape(file_column) + \
+            ','.join(get_field_format(table.dtype[column])
+                     for column in table.dtype.names) + '\n'
+        write_rows(out, row_format, table)
+
+
+def write_npz(out, stats_table, entity_tables):
+    """
+    Write the statistics and entity tables as the structured arrays of an
+    uncompressed NumPy .npz archive. The statistics are stored as 'stats',
+    a structured array with a float64 value column (see stats_struct).
+
+    inputs
+    ------
+    out : a binary file object
+    stats_table : the statistics (see get_stats_table)
+    entity_tables : the entity tables (see get_entity_tables)
+
+    outputs
+    -------
+    none
+    """
+    np.savez(out, stats=np.array(stats_table, dtype=stats_struct),
+             **entity_tables)
+
+
+writers = {'json': write_json, 'jsonl': write_jsonl, 'csv': write_csv,
+           'npz': write_npz}
+
+
+def write_stats(stats, data, output_format, output=None):
+    """
+    Write the statistics and entity tables in a machine readable format
+
+    inputs
+    ------
+    stats : a dictionary with information about certain statistics for a model
+    data : a dictionary with the data for each statistical area
+    output_format : one of 'json', 'jsonl', 'csv' and 'npz'
+    output : (optional) name of the output file. By default the output is
+             written to stdout.
+
+    outputs
+    -------
+    none
+    """
+    stats_table = get_stats_table(stats)
+    entity_tables = get_entity_tables(data)
+    with open_output(output, binary=output_format == 'npz') as out:
+        writers[output_format](out, stats_table, entity_tables)
+
+
+@contextmanager
+def open_output(output=None, binary=False):
+    """
+    Open the output file with a large buffer, or use stdout
+
+    inputs
+    ------
+    output : (optional) name of the output file. By default stdout is used.
+    binary : (boolean) whether to open the output in binary mode
+
+    outputs
+    -------
+    out : a file object, closed (or flushed for stdout) on exit
+    """
+    if output is None:
+        out = sys.stdout.buffer if binary else sys.stdout
+        try:
+            yield out
+        finally:
+            out.flush()
+        return
+    with open(output, 'wb' if binary else 'w', buffering=BUFFER_SIZE) as out:
+        yield out
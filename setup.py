@@ -1,3 +1,3 @@
 from setuptools import setup, find_packages
 
-setup(name="dagmc_stats",  packages=find_packages())
+setup(name="dagmc_stats",  packages=find_packages(), python_requires=">=3.6")
@@ -0,0 +1,62 @@
+from pymoab import core, types
+import dagmc_stats.dagmc_stats as ds
+from dagmc_stats.AnalysisSession import AnalysisSession
+import numpy as np
+
+test_env = {'single_cube': 'tests/single-cube.h5m',
+            'pyramid': 'tests/pyramid.h5m'}
+
+
+def load_session(filename):
+    my_core = core.Core()
+    my_core.load_file(filename)
+    return AnalysisSession(my_core)
+
+
+def test_mesh_reuse():
+    """Tests that the model mesh is built once and shared with the root set
+    """
+    session = load_session(test_env['single_cube'])
+    mesh = session.get_model_mesh()
+    assert(session.get_mesh() is mesh)
+    assert(session.get_mesh(session.root_set) is mesh)
+    vol = session.entityset_ranges['Volumes'][0]
+    assert(session.get_mesh(vol) is session.get_mesh(vol))
+    assert(session.get_mesh(vol).num_tris == 12)
+
+
+def test_statistics():
+    """Tests that the session statistics match the functional API
+    """
+    session = load_session(test_env['single_cube'])
+    my_core = session.my_core
+    root_set = session.root_set
+    geom_dim = session.dagmc_tags['geom_dim']
+    assert(session.get_triangles_per_surface() ==
+           ds.get_triangles_per_surface(my_core, session.entityset_ranges))
+    np.testing.assert_array_equal(
+        session.get_triangles_per_vertex_hist(),
+        ds.get_triangles_per_vertex_hist(my_core, session.native_ranges))
+    np.testing.assert_almost_equal(
+        sorted(session.get_triangle_aspect_ratio()),
+        sorted(ds.get_triangle_aspect_ratio(my_core, root_set, geom_dim)))
+    np.testing.assert_almost_equal(
+        sorted(session.get_area_triangle()),
+        sorted(ds.get_area_triangle(my_core, root_set, geom_dim)))
+    np.testing.assert_almost_equal(
+        session.get_coarseness(),
+        ds.get_coarseness(my_core, root_set,
+                          session.entityset_ranges['Surfaces'], geom_dim))
+
+
+def test_roughness():
+    """Tests that the session roughness matches the functional API
+    """
+    session = load_session(test_env['pyramid'])
+    exp = ds.get_roughness(session.my_core, session.native_ranges)
+    roughness = session.get_roughness()
+    assert(isinstance(roughness, np.ndarray))
+    obs = dict(zip(session.get_model_mesh().vert_handles.tolist(), roughness))
+    assert(obs.keys() == exp.keys())
+    for vert in exp:
+        np.testing.assert_almost_equal(obs[vert], exp[vert])
@@ -4,6 +4,7 @@ import dagmc_stats.DagmcFile as df
 import pandas as pd
 import numpy as np
 import warnings
+import pytest
 
 test_env = {'three_vols': 'tests/3vols.h5m',
             'single_cube': 'tests/single-cube.h5m', 'pyramid': 'tests/pyramid.h5m'}
@@ -30,14 +31,8 @@ def test_set_native_ranges():
     for i, native_range_type in enumerate(single_cube.entity_types):
         entity_range = single_cube._my_moab_core.get_entities_by_type(
             single_cube.root_set, native_range_type)
-        if native_range_type == types.MBENTITYSET:
-            # dimension meshsets are of type MBENTITYSE but not in native_ranges
-            num_dim_ms = len(single_cube.entityset_ranges)
-            test_pass[i] = (entity_range[:-num_dim_ms] ==
-                            single_cube.native_ranges[native_range_type])
-        else:
-            test_pass[i] = (
-                entity_range == single_cube.native_ranges[native_range_type])
+        test_pass[i] = (
+            entity_range == single_cube.native_ranges[native_range_type])
     assert(all(test_pass))
 
 
@@ -62,25 +57,129 @@ def test_set_entityset_ranges():
         type_range = list(single_cube._my_moab_core.get_entities_by_type_and_tag(
             single_cube.root_set, types.MBENTITYSET, single_cube.dagmc_tags['geom_dim'], [dimension]))
         test_pass[dimension] = (
-            type_range == single_cube.entityset_ranges[set_type])
+            type_range == list(single_cube.entityset_ranges[set_type]))
     assert(all(test_pass))
 
 
-def test_set_dimension_meshset():
+def test_geom_set_data():
     """
-    Tests different aspects of the set_dimension_meshset function
+    Tests that the bulk tag reads of set_entityset_ranges match the
+    per-entity tag values
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    my_core = three_vols._my_moab_core
+    geom_set_data = three_vols.geom_set_data
+    num_sets = sum(len(rng) for rng in three_vols.entityset_ranges.values())
+    assert(len(geom_set_data) == num_sets)
+    for row in geom_set_data[::7]:
+        handle = row['handle']
+        assert(row['geom_dim'] == my_core.tag_get_data(
+            three_vols.dagmc_tags['geom_dim'], handle)[0][0])
+        assert(row['global_id'] == my_core.tag_get_data(
+            three_vols.dagmc_tags['global_id'], handle)[0][0])
+    volumes = geom_set_data[geom_set_data['geom_dim'] == 3]
+    assert(all(category.startswith(b'Volume')
+               for category in volumes['category']))
+
+
+def test_geom_set_data_missing_tag(tmpdir):
+    """
+    Tests that a file whose geometric sets do not all have a CATEGORY tag
+    loads, with an empty category for the sets that lack it
+    """
+    my_core = core.Core()
+    geom_dim = my_core.tag_get_handle('GEOM_DIMENSION', 1,
+                                      types.MB_TYPE_INTEGER,
+                                      types.MB_TAG_SPARSE,
+                                      create_if_missing=True)
+    category = my_core.tag_get_handle('CATEGORY', 32, types.MB_TYPE_OPAQUE,
+                                      types.MB_TAG_SPARSE,
+                                      create_if_missing=True)
+    global_id = my_core.tag_get_handle('GLOBAL_ID', 1, types.MB_TYPE_INTEGER,
+                                       types.MB_TAG_DENSE,
+                                       create_if_missing=True)
+    surfs = [my_core.create_meshset(), my_core.create_meshset()]
+    for i, surf in enumerate(surfs):
+        my_core.tag_set_data(geom_dim, surf, np.array([2]))
+        my_core.tag_set_data(global_id, surf, np.array([i + 1]))
+    my_core.tag_set_data(category, surfs[0],
+                         np.array(['Surface'], dtype='S32'))
+    filename = str(tmpdir.join('missing_category.h5m'))
+    my_core.write_file(filename)
+    dagmc_file = df.DagmcFile(filename)
+    assert(len(dagmc_file.entityset_ranges['surfaces']) == 2)
+    np.testing.assert_array_equal(dagmc_file.geom_set_data['global_id'],
+                                  [1, 2])
+    np.testing.assert_array_equal(dagmc_file.geom_set_data['category'],
+                                  [b'Surface', b''])
+
+
+def test_range_to_array():
+    """
+    Tests the range_to_array function
+    """
+    single_cube = df.DagmcFile(test_env['single_cube'])
+    tris = single_cube.native_ranges[types.MBTRI]
+    obs = df.range_to_array(tris)
+    assert(obs.dtype == np.uint64)
+    assert(list(obs) == list(tris))
+
+
+def test_get_surface_tris():
+    """
+    Tests that get_surface_tris stores the triangles of each surface as one
+    contiguous segment
+    """
+    single_cube = df.DagmcFile(test_env['single_cube'])
+    my_core = single_cube._my_moab_core
+    surfs = single_cube.entityset_ranges['surfaces']
+    tris, surf_offsets = df.get_surface_tris(my_core, surfs)
+    assert(tris.dtype == np.uint64)
+    assert(len(surf_offsets) == len(surfs) + 1)
+    assert(surf_offsets[-1] == len(tris))
+    for s, surf in enumerate(surfs):
+        exp = list(my_core.get_entities_by_type(surf, types.MBTRI))
+        assert(list(tris[surf_offsets[s]:surf_offsets[s + 1]]) == exp)
+    tris, surf_offsets = df.get_surface_tris(my_core, [])
+    assert(len(tris) == 0)
+    np.testing.assert_array_equal(surf_offsets, [0])
+
+
+def test_dim_dict():
+    """
+    Tests that dim_dict is a read-only view of entityset_ranges that does not
+    add meshsets to the model
     """
-    test_pass = np.full(2, False)
     single_cube = df.DagmcFile(test_env['single_cube'])
-    mb_entityset = single_cube._my_moab_core.get_entities_by_type(
-        single_cube.root_set, types.MBENTITYSET)
+    my_core = single_cube._my_moab_core
+    exp = len(my_core.get_entities_by_type(single_cube.root_set,
+                                           types.MBENTITYSET))
     dim_list = ['nodes', 'curves', 'surfaces', 'volumes']
-    test_pass[0] = (sorted(single_cube.dim_dict.keys()) == sorted(dim_list))
-    # dimension meshsets are the last len(entityset_ranges) elements in mb_entityset
-    num_dim_ms = len(single_cube.entityset_ranges)
-    test_pass[1] = (sorted(single_cube.dim_dict.values())
-                    == list(mb_entityset[-num_dim_ms:]))
-    assert(all(test_pass))
+    assert(sorted(single_cube.dim_dict.keys()) == sorted(dim_list))
+    for set_type in dim_list:
+        assert(list(single_cube.dim_dict[set_type]) ==
+               list(single_cube.entityset_ranges[set_type]))
+    with pytest.raises(TypeError):
+        single_cube.dim_dict['volumes'] = Range()
+    obs = len(my_core.get_entities_by_type(single_cube.root_set,
+                                           types.MBENTITYSET))
+    assert(exp == obs)
+
+
+def test_no_scratch_meshset():
+    """
+    Tests that loading the file and querying meshsets by id do not add
+    meshsets to the model
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    my_core = three_vols._my_moab_core
+    exp = len(my_core.get_entities_by_type(three_vols.root_set,
+                                           types.MBENTITYSET))
+    three_vols.get_meshset_by_id('volumes', [1, 2])
+    obs = len(my_core.get_entities_by_type(three_vols.root_set,
+                                           types.MBENTITYSET))
+    assert(exp == obs)
+    assert(obs == len(three_vols.native_ranges[types.MBENTITYSET]))
 
 
 def test_get_meshset_by_id():
@@ -143,6 +242,22 @@ def test_get_meshset_by_id_out_of_range_dim():
     assert(all(test_pass))
 
 
+def test_get_meshset_by_id_partly_out_of_range():
+    """
+    Tests that the get_meshset_by_id function returns the meshsets of the
+    ids that exist and warns once about all the missing ids
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    exp = list(three_vols._my_moab_core.get_entities_by_type_and_tag(
+        three_vols.root_set, types.MBENTITYSET, three_vols.dagmc_tags['geom_dim'], [3]))
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        obs = three_vols.get_meshset_by_id('volumes', ids=[3, 7, 1, 8])
+    assert(obs == [exp[2], exp[0]])
+    assert(len(w) == 1)
+    assert('[7, 8]' in str(w[-1].message))
+
+
 def test_get_meshset_by_id_invalid_dim():
     """
     Tests the get_meshset_by_id function given invalid dim
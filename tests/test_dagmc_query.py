@@ -2,6 +2,7 @@ from pymoab import core, types
 from pymoab.rng import Range
 import dagmc_stats.DagmcFile as df
 import dagmc_stats.DagmcQuery as dq
+import dagmc_stats.geometry as geom
 import pandas as pd
 import numpy as np
 import warnings
@@ -95,6 +96,20 @@ def test_get_entities_vol_and_surf():
     exp = list(list(three_vols._my_moab_core.get_child_meshsets(vol)) + [surf])
     assert(three_vols_query.meshset_lst == exp)
 
+def test_rationalize_meshset_range():
+    """Tests the rationalize_meshset function for a Range and an array of
+    meshsets
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    vols = three_vols.entityset_ranges['volumes']
+    exp = list(three_vols.entityset_ranges['surfaces'])
+    range_query = dq.DagmcQuery(three_vols, vols)
+    assert(range_query.meshset_lst == exp)
+    array_query = dq.DagmcQuery(three_vols, np.array(list(vols),
+                                                     dtype=np.uint64))
+    assert(array_query.meshset_lst == exp)
+
+
 def test_rationalize_meshset_rootset_in_list():
     """Tests the rationalize_meshset function for a list containing rootset
     """
@@ -168,7 +183,18 @@ def test_calc_tris_per_vert_surf():
     surf = three_vols.entityset_ranges['surfaces'][0]
     three_vols_query = dq.DagmcQuery(three_vols, surf)
     three_vols_query.calc_tris_per_vert()
-    assert(sorted(three_vols_query._vert_data['tri_per_vert']) == [4, 4, 5, 5])
+    # only the two triangles of the surface are counted
+    assert(sorted(three_vols_query._vert_data['tri_per_vert']) == [1, 1, 2, 2])
+
+
+def test_get_tris_per_vert_hist():
+    """Tests the get_tris_per_vert_hist function for volume meshset
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    vol = three_vols.entityset_ranges['volumes'][0]
+    three_vols_query = dq.DagmcQuery(three_vols, vol)
+    obs = three_vols_query.get_tris_per_vert_hist()
+    np.testing.assert_array_equal(obs, [0, 0, 0, 0, 4, 4])
 
 
 def test_calc_tris_per_surf_vol():
@@ -281,6 +307,120 @@ def test_coarseness():
         list(three_vols_query._surf_data['coarseness']), list(np.full(6, 0.02)))
 
 
+def test_compute():
+    """Tests that compute calculates the requested metrics and the metrics
+    they require, and frees the mesh intermediates afterwards on request
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    vol = three_vols.entityset_ranges['volumes'][0]
+    three_vols_query = dq.DagmcQuery(three_vols, vol)
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        three_vols_query.compute(['coarseness', 'aspect_ratio'],
+                                 release=True)
+        three_vols_query.compute(['coarseness'])
+        assert(len(w) == 0)
+    assert('area' in three_vols_query._tri_metrics)
+    np.testing.assert_almost_equal(
+        list(three_vols_query._surf_data['coarseness']), list(np.full(6, 0.02)))
+    assert(three_vols_query._mesh._cache == {})
+
+
+def test_compute_parallel():
+    """Tests that a query with worker processes gives the same metrics and
+    global averages as a single process query
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    metrics = ['aspect_ratio', 'coarseness', 'roughness']
+    serial_query = dq.DagmcQuery(three_vols)
+    serial_query.compute(metrics)
+    parallel_query = dq.DagmcQuery(three_vols, workers=2)
+    parallel_query.compute(metrics)
+    assert(parallel_query._tri_data.equals(serial_query._tri_data))
+    assert(parallel_query._surf_data.equals(serial_query._surf_data))
+    assert(parallel_query._vert_data.equals(serial_query._vert_data))
+    assert(parallel_query._global_averages == serial_query._global_averages)
+
+
+def test_compute_parallel_no_shared_memory(monkeypatch):
+    """Tests that a query with worker processes warns and computes the
+    metrics in a single process if shared memory is not available
+    """
+    import dagmc_stats.parallel as parallel
+    monkeypatch.setattr(parallel, 'shared_memory', None)
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    serial_query = dq.DagmcQuery(three_vols)
+    serial_query.compute(['aspect_ratio'])
+    parallel_query = dq.DagmcQuery(three_vols, workers=2)
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        parallel_query.compute(['aspect_ratio'])
+        assert(len(w) == 1)
+        assert('Python 3.8' in str(w[-1].message))
+    assert(parallel_query._tri_data.equals(serial_query._tri_data))
+
+
+def test_compute_parallel_cached():
+    """Tests that the worker processes are not used for intermediates that
+    are cached already
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    parallel_query = dq.DagmcQuery(three_vols, workers=2)
+    tri_geometry = parallel_query.get_tri_geometry().copy()
+    tri_geometry['aspect_ratio'] = 7.
+    parallel_query._mesh.store('tri_geometry', tri_geometry)
+    parallel_query.compute(['aspect_ratio'])
+    np.testing.assert_array_equal(parallel_query.aspect_ratio,
+                                  np.full(len(tri_geometry), 7.))
+
+
+def test_compute_threads(monkeypatch):
+    """Tests that a query with threaded kernels gives the same metrics as a
+    single threaded query. The chunks are made small enough for the small
+    model to be split across the threads.
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    metrics = ['aspect_ratio', 'area', 'tri_per_vert', 'roughness']
+    serial_query = dq.DagmcQuery(three_vols)
+    serial_query.compute(metrics)
+    monkeypatch.setattr(geom, 'CHUNK_SIZE', 4)
+    chunked_rows = []
+    map_chunks = geom.map_chunks
+
+    def record_map_chunks(func, num_rows, threads, chunk_size=None):
+        chunked_rows.append(num_rows)
+        return map_chunks(func, num_rows, threads, chunk_size)
+
+    monkeypatch.setattr(geom, 'map_chunks', record_map_chunks)
+    threaded_query = dq.DagmcQuery(three_vols, threads=2)
+    assert(threaded_query._mesh.threads == 2)
+    threaded_query.compute(metrics)
+    assert(len(chunked_rows) > 0)
+    assert(threaded_query._tri_data.equals(serial_query._tri_data))
+    np.testing.assert_array_equal(
+        threaded_query._vert_data['tri_per_vert'],
+        serial_query._vert_data['tri_per_vert'])
+    # the threaded accumulations may differ from the single pass ones by
+    # rounding
+    np.testing.assert_allclose(threaded_query._vert_data['roughness'],
+                               serial_query._vert_data['roughness'])
+
+
+def test_lazy_metric():
+    """Tests that the metric properties are calculated on first access
+    """
+    three_vols = df.DagmcFile(test_env['three_vols'])
+    surf = three_vols.entityset_ranges['surfaces'][0]
+    three_vols_query = dq.DagmcQuery(three_vols, surf)
+    assert('area' not in three_vols_query._tri_metrics)
+    np.testing.assert_almost_equal(three_vols_query.area, np.full(2, 50))
+    assert('area' in three_vols_query._tri_metrics)
+    # the other triangle metrics are read from the cached triangle geometry
+    tri_geometry = three_vols_query.get_tri_geometry()
+    three_vols_query.aspect_ratio
+    assert(three_vols_query.get_tri_geometry() is tri_geometry)
+
+
 def test_roughness():
     """Tests the calc roughness function, __calc_average_roughness() function
     and __calc_tri_roughness() function.
@@ -421,3 +561,4 @@ def test_add_tag_inconsistent_dic_val_len():
             test_pass[5] = True
 
     assert(all(test_pass))
+
@@ -77,6 +77,16 @@ class TestDagmcStats(unittest.TestCase):
         assert(len(t_p_v_data) == vertices)
 
 
+    def test_get_triangles_per_vertex_hist(self):
+        """Tests part of the get_triangles_per_vertex_hist function"""
+        my_core = test_env[0]['core']
+        native_ranges = test_env[0]['native_ranges']
+        
+        t_p_v_data = ds.get_triangles_per_vertex(my_core, native_ranges)
+        t_p_v_hist = ds.get_triangles_per_vertex_hist(my_core, native_ranges)
+        np.testing.assert_array_equal(t_p_v_hist, np.bincount(t_p_v_data))
+
+
     def test_get_triangles_per_surface(self):
         """
         Tests some parts of the get_triangles_per_surface function
@@ -160,6 +170,27 @@ class TestDagmcStats(unittest.TestCase):
         self.assertAlmostEqual(exp, obs)
 
 
+    def test_get_tris(self):
+        """
+        Tests that get_tris gathers the triangles without adding meshsets
+        """
+        my_core = test_env[0]['core']
+        root_set = test_env[0]['root_set']
+        dagmc_tags = test_env[0]['dagmc_tags']
+        volumes = my_core.get_entities_by_type_and_tag(
+            root_set, types.MBENTITYSET, dagmc_tags['geom_dim'], [3])
+        exp_sets = my_core.get_entities_by_type(root_set, types.MBENTITYSET).size()
+        
+        obs = ds.get_tris(my_core, volumes[0], dagmc_tags['geom_dim']).size()
+        self.assertEqual(12, obs)
+        surface = my_core.get_child_meshsets(volumes[0])[0]
+        obs = ds.get_tris(my_core, surface, dagmc_tags['geom_dim']).size()
+        self.assertEqual(2, obs)
+        
+        obs_sets = my_core.get_entities_by_type(root_set, types.MBENTITYSET).size()
+        self.assertEqual(exp_sets, obs_sets)
+
+
     def test_get_tri_vert_data(self):
         """Tests part of the get_tri_vert_data function
         """
@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('mpi4py')
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+generate_stats = os.path.join(package_dir, 'dagmc_stats', 'generate_stats.py')
+test_file = os.path.join(package_dir, 'tests', 'pyramid.h5m')
+
+
+def run_stats(args, mpi_ranks=None):
+    """Run generate_stats with json output and get the statistics
+    """
+    command = [sys.executable, generate_stats, test_file, '--format',
+               'json'] + args
+    if mpi_ranks is not None:
+        command = ['mpirun', '-n', str(mpi_ranks)] + command + ['--mpi']
+    env = dict(os.environ, OMPI_MCA_rmaps_base_oversubscribe='1')
+    out = subprocess.run(command, cwd=package_dir, env=env, check=True,
+                         stdout=subprocess.PIPE,
+                         universal_newlines=True).stdout
+    return json.loads(out)['stats']
+
+
+@pytest.mark.skipif(shutil.which('mpirun') is None,
+                    reason='mpirun is not available')
+def test_mpi_matches_serial():
+    """Tests that the statistics of an MPI run with 4 ranks match those of
+    the serial path
+    """
+    args = ['--spv', '--tps', '--tpv', '--tar', '--at', '--c', '--r']
+    exp = run_stats(args)
+    obs = run_stats(args, mpi_ranks=4)
+    assert(obs.keys() == exp.keys())
+    for name, statistics in exp.items():
+        assert(obs[name].keys() == statistics.keys())
+        for key, value in statistics.items():
+            np.testing.assert_allclose(obs[name][key], value, rtol=1e-9,
+                                       atol=1e-12)
+
+
+@pytest.mark.skipif(shutil.which('mpirun') is None,
+                    reason='mpirun is not available')
+def test_mpi_more_ranks_than_vertices():
+    """Tests the per-vertex statistics of an MPI run with more ranks than
+    the model has vertices, so that some ranks own no vertices
+    """
+    args = ['--tpv', '--r']
+    exp = run_stats(args)
+    obs = run_stats(args, mpi_ranks=8)
+    for name, statistics in exp.items():
+        for key, value in statistics.items():
+            np.testing.assert_allclose(obs[name][key], value, rtol=1e-9,
+                                       atol=1e-12)
@@ -0,0 +1,61 @@
+from pymoab import core, types
+from pymoab.rng import Range
+import dagmc_stats.dagmc_stats as ds
+import dagmc_stats.entity_specific_stats as ess
+import numpy as np
+
+test_env = {'three_vols': 'tests/3vols.h5m'}
+
+my_core = core.Core()
+my_core.load_file(test_env['three_vols'])
+root_set = my_core.get_root_set()
+dagmc_tags = ds.get_dagmc_tags(my_core)
+entityset_ranges = ds.get_entityset_ranges(my_core, root_set,
+                                           dagmc_tags['geom_dim'])
+
+
+def test_get_spv_data():
+    """Tests the get_spv_data function against per-volume queries
+    """
+    spv_data = ess.get_spv_data(my_core, entityset_ranges,
+                                dagmc_tags['global_id'])
+    assert(len(spv_data) == len(entityset_ranges['Volumes']))
+    for volume, global_id, surfaces in spv_data:
+        assert(global_id ==
+               my_core.tag_get_data(dagmc_tags['global_id'], volume)[0][0])
+        assert(surfaces == my_core.get_child_meshsets(volume).size())
+
+
+def test_get_tps_data():
+    """Tests the get_tps_data function against per-surface queries
+    """
+    tps_data = ess.get_tps_data(my_core, entityset_ranges,
+                                dagmc_tags['global_id'])
+    assert(len(tps_data) == len(entityset_ranges['Surfaces']))
+    np.testing.assert_array_equal(tps_data['triangles'], 2)
+    for surface, global_id, triangles in tps_data:
+        assert(global_id ==
+               my_core.tag_get_data(dagmc_tags['global_id'], surface)[0][0])
+
+
+def test_get_tps_data_counts():
+    """Tests that get_tps_data takes the triangle counts of the surfaces
+    when they are given instead of querying them
+    """
+    tris_per_surf = np.arange(len(entityset_ranges['Surfaces']))
+    tps_data = ess.get_tps_data(my_core, entityset_ranges,
+                                dagmc_tags['global_id'], tris_per_surf)
+    np.testing.assert_array_equal(tps_data['triangles'], tris_per_surf)
+
+
+def test_get_global_ids_missing_tag():
+    """Tests that the sets without a Global ID get -1, as in DagmcFile
+    """
+    my_core = core.Core()
+    global_id = my_core.tag_get_handle('GLOBAL_ID', 1, types.MB_TYPE_INTEGER,
+                                       types.MB_TAG_SPARSE,
+                                       create_if_missing=True)
+    sets = [my_core.create_meshset(), my_core.create_meshset()]
+    my_core.tag_set_data(global_id, sets[1], np.array([7]))
+    global_ids = ess.get_global_ids(my_core, Range(sets), global_id)
+    np.testing.assert_array_equal(global_ids, [-1, 7])
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+generate_stats = os.path.join(package_dir, 'dagmc_stats', 'generate_stats.py')
+test_files = ['tests/pyramid.h5m', 'tests/single-cube.h5m']
+
+
+def run_generate_stats(args):
+    """Run generate_stats from the package directory and get the result
+    """
+    return subprocess.run([sys.executable, generate_stats] + args,
+                          cwd=package_dir, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def get_hist_stats(hist):
+    """Run generate_stats.get_hist_stats in a fresh interpreter, since the
+    script can not be imported alongside the dagmc_stats package
+    """
+    code = ('import json, generate_stats\n'
+            'stats = generate_stats.get_hist_stats(' + repr(hist) + ')\n'
+            'print(json.dumps({k: float(v) for k, v in stats.items()}))\n')
+    out = subprocess.run([sys.executable, '-c', code],
+                         cwd=os.path.dirname(generate_stats), check=True,
+                         stdout=subprocess.PIPE,
+                         universal_newlines=True).stdout
+    return json.loads(out)
+
+
+def test_batch_jsonl_list():
+    """Tests batch mode with a list of files and the default jsonl output
+    """
+    result = run_generate_stats(test_files + ['--tps', '--jobs', '2'])
+    assert(result.returncode == 0)
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert(sorted(set(record['file'] for record in records)) == test_files)
+    assert(all(record['table'] == 'stats' for record in records))
+    assert(all(record['name'] == 'T_P_S' for record in records))
+
+
+def test_batch_glob():
+    """Tests that the glob patterns are expanded in sorted order
+    """
+    result = run_generate_stats(['tests/[ps]*.h5m', '--tps', '--format',
+                                 'csv'])
+    assert(result.returncode == 0)
+    blocks = result.stdout.split('\n\n')
+    assert(len(blocks) == 2)
+    for block, filename in zip(blocks, test_files):
+        lines = block.splitlines()
+        assert(lines[0] == 'file,name,key,value')
+        assert(all(line.startswith('"' + filename + '",')
+                   for line in lines[1:]))
+
+
+def test_batch_failed_file():
+    """Tests that a file that can not be analyzed is reported and skipped,
+    that the exit status is nonzero and that the csv output does not start
+    with a separator
+    """
+    result = run_generate_stats(['tests/missing.h5m', 'tests/pyramid.h5m',
+                                 '--tps', '--format', 'csv'])
+    assert(result.returncode != 0)
+    assert('tests/missing.h5m could not be analyzed' in result.stderr)
+    assert(result.stdout.startswith('file,name,key,value\n'))
+    assert('\n\n' not in result.stdout)
+    assert('"tests/pyramid.h5m",T_P_S,' in result.stdout)
+
+
+def test_get_hist_stats():
+    """Tests that the statistics of a histogram match those of the dataset
+    it counts
+    """
+    for hist in [[0, 3, 0, 0, 5, 1, 0, 2], [0, 0, 4], [2, 0, 0, 0, 0, 0, 7]]:
+        data = np.repeat(np.arange(len(hist)), hist)
+        stats = get_hist_stats(hist)
+        assert(stats['minimum'] == data.min())
+        assert(stats['maximum'] == data.max())
+        np.testing.assert_allclose(stats['mean'], np.mean(data))
+        np.testing.assert_allclose(stats['variance'], np.var(data))
+        for name, q in [('median', 50), ('p1', 1), ('p5', 5), ('p95', 95),
+                        ('p99', 99)]:
+            np.testing.assert_allclose(stats[name], np.percentile(data, q))
+    stats = get_hist_stats([0, 0])
+    assert(all(np.isnan(value) for value in stats.values()))
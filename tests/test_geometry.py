@@ -0,0 +1,201 @@
+import dagmc_stats.geometry as geom
+import numpy as np
+
+# a unit right triangle in the xy plane and an equilateral triangle with
+# side length 2 sharing the vertex at the origin
+coords = np.array([[0., 0., 0.],
+                   [1., 0., 0.],
+                   [0., 1., 0.],
+                   [2., 0., 0.],
+                   [1., np.sqrt(3), 0.]])
+conn = np.array([[0, 1, 2],
+                 [0, 3, 4]])
+
+
+def test_tri_side_lengths():
+    """Tests the tri_side_lengths function
+    """
+    obs = geom.tri_side_lengths(coords, conn)
+    exp = [[np.sqrt(2), 1., 1.],
+           [2., 2., 2.]]
+    np.testing.assert_almost_equal(obs, exp)
+
+
+def test_tri_side_lengths_empty():
+    """Tests the tri_side_lengths function given no triangles
+    """
+    obs = geom.tri_side_lengths(coords, np.zeros((0, 3), dtype=int))
+    assert(obs.shape == (0, 3))
+
+
+def test_tri_geometry():
+    """Tests the columns of the tri_geometry function
+    """
+    obs = geom.tri_geometry(coords, conn)
+    np.testing.assert_almost_equal(obs['side_lengths'],
+                                   geom.tri_side_lengths(coords, conn))
+    np.testing.assert_almost_equal(obs['angles'],
+                                   [[np.pi/2, np.pi/4, np.pi/4],
+                                    [np.pi/3, np.pi/3, np.pi/3]])
+    np.testing.assert_almost_equal(obs['area'], [0.5, np.sqrt(3)])
+    exp_tar = np.sqrt(2) / (8 * (1 - np.sqrt(2)/2) * 0.5)
+    np.testing.assert_almost_equal(obs['aspect_ratio'], [exp_tar, 1.])
+
+
+def test_gaussian_curvature():
+    """Tests the gaussian_curvature function, including a vertex that is not
+    connected to any triangle
+    """
+    angles = geom.tri_geometry(coords, conn)['angles']
+    obs = geom.gaussian_curvature(conn, angles, 6)
+    exp = [2*np.pi - np.pi/2 - np.pi/3, 2*np.pi - np.pi/4,
+           2*np.pi - np.pi/4, 2*np.pi - np.pi/3, 2*np.pi - np.pi/3, 2*np.pi]
+    np.testing.assert_almost_equal(obs, exp)
+
+
+def pyramid():
+    """Build the pyramid of the roughness tests (height 5 and square base
+    with side length 5) as coordinate and connectivity arrays
+    """
+    apex_height = np.sqrt(25 - 2 * 2.5**2)
+    pyr_coords = np.array([[0., 0., 0.],
+                           [5., 0., 0.],
+                           [5., 5., 0.],
+                           [0., 5., 0.],
+                           [2.5, 2.5, apex_height]])
+    pyr_conn = np.array([[0, 2, 1],
+                         [0, 3, 2],
+                         [0, 1, 4],
+                         [1, 2, 4],
+                         [2, 3, 4],
+                         [3, 0, 4]])
+    return pyr_coords, pyr_conn
+
+
+def test_cotangent_weights():
+    """Tests the symmetry and values of the cotangent_weights function
+    """
+    pyr_coords, pyr_conn = pyramid()
+    angles = geom.tri_geometry(pyr_coords, pyr_conn)['angles']
+    rows, cols, weights = geom.cotangent_weights(pyr_conn, angles, 5)
+    # 9 edges stored in both directions
+    assert(len(rows) == 18)
+    dense = np.zeros((5, 5))
+    dense[rows, cols] = weights
+    np.testing.assert_almost_equal(dense, dense.T)
+    # base diagonal, base side and lateral edge
+    np.testing.assert_almost_equal(dense[0, 2], 0)
+    np.testing.assert_almost_equal(
+        dense[0, 1], 0.5 * (1 / np.tan(np.pi / 4) + 1 / np.tan(np.pi / 3)))
+    np.testing.assert_almost_equal(dense[0, 4], 1 / np.tan(np.pi / 3))
+
+
+def test_local_roughness():
+    """Tests the local_roughness function against the per-vertex formula
+    """
+    pyr_coords, pyr_conn = pyramid()
+    angles = geom.tri_geometry(pyr_coords, pyr_conn)['angles']
+    gc = geom.gaussian_curvature(pyr_conn, angles, 5)
+    rows, cols, weights = geom.cotangent_weights(pyr_conn, angles, 5)
+    obs = geom.local_roughness(gc, rows, cols, weights)
+
+    gc_top = 2.0/3*np.pi
+    gc_bottom = 5.0/6*np.pi
+    d_bottom = [1/np.tan(np.pi/3),
+                0.5*(1/np.tan(np.pi/3)+1/np.tan(np.pi/4)), 0]
+    lr_top = np.abs(gc_top - gc_bottom)
+    lr_bottom = [np.abs(gc_bottom -
+                        (d_bottom[0]*gc_top+2*d_bottom[1]*gc_bottom)
+                        / (d_bottom[0]+2*d_bottom[1])),
+                 np.abs(gc_bottom -
+                        (d_bottom[0]*gc_top+2*d_bottom[1]*gc_bottom
+                         + d_bottom[2]*gc_bottom)
+                        / (d_bottom[0]+2*d_bottom[1]+d_bottom[2]))]
+    exp = [lr_bottom[1], lr_bottom[0], lr_bottom[1], lr_bottom[0], lr_top]
+    np.testing.assert_almost_equal(obs, exp)
+
+
+def test_local_roughness_isolated_vert():
+    """Tests that local_roughness gives NaN for a vertex without triangles
+    """
+    angles = geom.tri_geometry(coords, conn)['angles']
+    gc = geom.gaussian_curvature(conn, angles, 6)
+    rows, cols, weights = geom.cotangent_weights(conn, angles, 6)
+    obs = geom.local_roughness(gc, rows, cols, weights)
+    assert(np.isnan(obs[5]))
+    assert(not np.isnan(obs[:5]).any())
+
+
+def test_vert_tri_adjacency():
+    """Tests the vert_tri_adjacency function
+    """
+    indptr, indices = geom.vert_tri_adjacency(conn, 6)
+    np.testing.assert_array_equal(indptr, [0, 2, 3, 4, 5, 6, 6])
+    np.testing.assert_array_equal(indices, [0, 1, 0, 0, 1, 1])
+
+
+def test_segment_sum():
+    """Tests the segment_sum function, including an empty segment
+    """
+    obs = geom.segment_sum(np.array([1., 2., 3., 4.]), [0, 2, 2, 4])
+    np.testing.assert_almost_equal(obs, [3., 0., 7.])
+
+
+def test_vert_area():
+    """Tests the vert_area function, including a vertex that is not
+    connected to any triangle
+    """
+    tri_area = geom.tri_geometry(coords, conn)['area']
+    obs = geom.vert_area(conn, tri_area, 6)
+    exp = [0.5 + np.sqrt(3), 0.5, 0.5, np.sqrt(3), np.sqrt(3), 0.]
+    np.testing.assert_almost_equal(obs, exp)
+
+
+def test_tris_per_vert():
+    """Tests the tris_per_vert function, including a vertex that is not
+    connected to any triangle
+    """
+    obs = geom.tris_per_vert(conn, 6)
+    np.testing.assert_array_equal(obs, [2, 1, 1, 1, 1, 0])
+
+
+def test_bincount_threads():
+    """Tests that the threaded bincount matches np.bincount
+    """
+    rng = np.random.default_rng(0)
+    index = rng.integers(0, 1000, 3 * geom.CHUNK_SIZE + 5)
+    weights = rng.random(len(index))
+    np.testing.assert_array_equal(geom.bincount(index, threads=4),
+                                  np.bincount(index))
+    obs = geom.bincount(index, weights=weights, minlength=1200, threads=5)
+    assert(len(obs) == 1200)
+    np.testing.assert_allclose(obs, np.bincount(index, weights=weights,
+                                                minlength=1200))
+
+
+def test_tri_geometry_threads():
+    """Tests that the chunked triangle geometry is identical to the single
+    pass one
+    """
+    rng = np.random.default_rng(1)
+    coords = rng.random((500, 3))
+    conn = np.argsort(rng.random((2 * geom.CHUNK_SIZE + 7, 500)),
+                      axis=1)[:, :3]
+    exp = geom.tri_geometry(coords, conn)
+    obs = geom.tri_geometry(coords, conn, threads=3)
+    for name in exp.dtype.names:
+        np.testing.assert_array_equal(obs[name], exp[name])
+
+
+def test_cotangent_weights_threads():
+    """Tests that the cotangent weights summed in vertex blocks are
+    identical to the single pass ones
+    """
+    rng = np.random.default_rng(2)
+    conn = np.argsort(rng.random((geom.CHUNK_SIZE + 11, 300)),
+                      axis=1)[:, :3]
+    angles = rng.random(conn.shape) + 0.1
+    exp = geom.cotangent_weights(conn, angles, 301)
+    obs = geom.cotangent_weights(conn, angles, 301, threads=3)
+    for obs_column, exp_column in zip(obs, exp):
+        np.testing.assert_array_equal(obs_column, exp_column)
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import sys
+
+# heavy modules that none of the core modules may import on startup
+HEAVY_MODULES = ['pandas', 'multiprocessing', 'mpi4py']
+
+# seconds allowed for the modules that an import adds on top of NumPy and
+# pymoab. The package modules take a few milliseconds on their own, so this
+# only fails if a heavy dependency creeps in.
+ADDED_IMPORT_BUDGET = 0.25
+
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+script_dir = os.path.join(package_dir, 'dagmc_stats')
+
+
+def get_heavy_imports(modules, cwd=package_dir, watched=HEAVY_MODULES):
+    """Import modules in a fresh interpreter and get the watched modules
+    that were imported along with them
+    """
+    code = ('import sys\n'
+            'import ' + ', '.join(modules) + '\n'
+            'print(" ".join(m for m in ' + repr(watched) +
+            ' if m in sys.modules))\n')
+    out = subprocess.run([sys.executable, '-c', code], cwd=cwd, check=True,
+                         stdout=subprocess.PIPE,
+                         universal_newlines=True).stdout.split()
+    return out
+
+
+def get_import_times(modules, cwd=package_dir):
+    """Import modules in a fresh interpreter with -X importtime and get the
+    self time in seconds of every module that was imported
+    """
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                          'import ' + ', '.join(modules)], cwd=cwd,
+                         check=True, stderr=subprocess.PIPE,
+                         universal_newlines=True).stderr
+    import_times = {}
+    for line in err.splitlines():
+        fields = line.split('|')
+        if len(fields) != 3 or not fields[0].startswith('import time:'):
+            continue
+        self_time = fields[0].split(':')[1].strip()
+        if self_time.isdigit():
+            import_times[fields[2].strip()] = int(self_time) * 1e-6
+    return import_times
+
+
+def get_added_import_time(modules, baseline, cwd=package_dir):
+    """Get the time in seconds that importing modules takes for the modules
+    that importing baseline alone does not load. Only the self times of
+    those modules are summed, so the time spent in the baseline imports does
+    not count, however slow the machine is.
+    """
+    baseline_modules = get_import_times(baseline, cwd)
+    import_times = get_import_times(modules, cwd)
+    return sum(import_time for module, import_time in import_times.items()
+               if module not in baseline_modules)
+
+
+def test_array_core_import():
+    """Tests that the NumPy-only modules do not import pandas,
+    multiprocessing or mpi4py, and the time they add to importing NumPy
+    """
+    modules = ['dagmc_stats.geometry', 'dagmc_stats.TriangleMesh',
+               'dagmc_stats.MetricTable', 'dagmc_stats.StreamingSummary',
+               'dagmc_stats.stats_output']
+    assert(get_heavy_imports(modules) == [])
+    assert(get_added_import_time(modules, ['numpy']) < ADDED_IMPORT_BUDGET)
+
+
+def test_analysis_core_import():
+    """Tests that the pymoab based modules do not import pandas,
+    multiprocessing or mpi4py, and the time they add to importing NumPy and
+    pymoab
+    """
+    modules = ['dagmc_stats.DagmcFile', 'dagmc_stats.DagmcQuery',
+               'dagmc_stats.AnalysisSession', 'dagmc_stats.dagmc_stats']
+    assert(get_heavy_imports(modules) == [])
+    assert(get_added_import_time(modules, ['numpy', 'pymoab.core']) <
+           ADDED_IMPORT_BUDGET)
+
+
+def test_generate_stats_import():
+    """Tests that the generate_stats script does not import pandas,
+    multiprocessing or mpi4py, nor the analysis session and output modules,
+    on startup, and the time it adds to importing NumPy and pymoab
+    """
+    heavy_imports = get_heavy_imports(
+        ['generate_stats'], cwd=script_dir,
+        watched=HEAVY_MODULES + ['AnalysisSession', 'StreamingSummary',
+                                 'stats_output'])
+    assert(heavy_imports == [])
+    assert(get_added_import_time(['generate_stats'], ['numpy', 'pymoab.core'],
+                                 cwd=script_dir) < ADDED_IMPORT_BUDGET)
@@ -0,0 +1,45 @@
+from dagmc_stats.MetricTable import MetricTable
+import pandas as pd
+import numpy as np
+
+
+def test_empty_table():
+    """Tests that a table without metrics exports an empty DataFrame
+    """
+    table = MetricTable([1, 2, 3], 'vert_eh')
+    assert(len(table) == 3)
+    assert('area' not in table)
+    assert(table.to_dataframe().equals(pd.DataFrame()))
+
+
+def test_add_column():
+    """Tests adding full columns to the table
+    """
+    table = MetricTable([5, 6], 'tri_eh')
+    table.add_column('area', [0.5, 1.5])
+    table.add_column('aspect_ratio', np.array([1., 2.]))
+    assert('area' in table)
+    np.testing.assert_array_equal(table.get_column('area'), [0.5, 1.5])
+    obs = table.to_dataframe()
+    assert(list(obs.columns) == ['tri_eh', 'area', 'aspect_ratio'])
+    assert(list(obs['tri_eh']) == [5, 6])
+    assert(list(obs['aspect_ratio']) == [1., 2.])
+
+
+def test_add_partial_column():
+    """Tests that rows without any metric value are not exported and that
+    missing values are exported as NaN
+    """
+    table = MetricTable([1, 2, 3], 'vert_eh')
+    keep = np.array([True, False, True])
+    table.add_column('tri_per_vert', [4, 5], rows=keep)
+    obs = table.to_dataframe()
+    assert(list(obs['vert_eh']) == [1, 3])
+    assert(list(obs['tri_per_vert']) == [4, 5])
+
+    table.add_column('roughness', [0.25], rows=[1])
+    obs = table.to_dataframe()
+    assert(list(obs['vert_eh']) == [1, 2, 3])
+    assert(np.isnan(obs['tri_per_vert'][1]))
+    assert(np.isnan(obs['roughness'][0]))
+    assert(obs['roughness'][1] == 0.25)
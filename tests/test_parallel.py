@@ -0,0 +1,110 @@
+import pytest
+pytest.importorskip('multiprocessing.shared_memory')
+from dagmc_stats.TriangleMesh import TriangleMesh
+import dagmc_stats.parallel as parallel
+from dagmc_stats.SharedArrays import SharedArrays, attach
+import numpy as np
+
+
+def random_mesh(num_surfs=7, seed=0):
+    """Build a mesh of random triangles that share vertices, split into
+    surfaces of uneven sizes
+    """
+    rng = np.random.default_rng(seed)
+    coords = rng.random((200, 3))
+    tris_per_surf = rng.integers(1, 60, num_surfs)
+    # three distinct vertices per triangle
+    conn = np.argsort(rng.random((tris_per_surf.sum(), 200)), axis=1)[:, :3]
+    surf_offsets = np.concatenate([[0], np.cumsum(tris_per_surf)])
+    return TriangleMesh(coords, conn, surf_offsets=surf_offsets)
+
+
+def test_get_shards():
+    """Tests that the shards cover every surface once and are balanced
+    """
+    tris_per_surf = np.array([10, 1, 7, 3, 3, 9, 2])
+    shards = parallel.get_shards(tris_per_surf, 3)
+    assert(len(shards) == 3)
+    np.testing.assert_array_equal(np.sort(np.concatenate(shards)),
+                                  np.arange(7))
+    loads = [tris_per_surf[shard].sum() for shard in shards]
+    assert(max(loads) - min(loads) <= 1)
+    assert(len(parallel.get_shards(tris_per_surf[:2], 8)) == 2)
+
+
+def test_compute_surface_shards():
+    """Tests that the sharded triangle geometry and surface areas are
+    identical to the single process ones
+    """
+    serial = random_mesh()
+    sharded = random_mesh()
+    parallel.compute_surface_shards(sharded, 3)
+    exp = serial.get_tri_geometry()
+    obs = sharded._cache['tri_geometry']
+    for name in exp.dtype.names:
+        np.testing.assert_array_equal(obs[name], exp[name])
+    np.testing.assert_array_equal(sharded._cache['surf_area'],
+                                  serial.get_surf_area())
+    assert(sharded.get_average_roughness() == serial.get_average_roughness())
+
+
+def test_shared_arrays():
+    """Tests that attached shared arrays are read-only views of the exported
+    mesh and that closing removes the shared memory
+    """
+    mesh = random_mesh()
+    with SharedArrays.from_mesh(mesh) as shared:
+        shared.empty('result', (3,), np.float64)
+        arrays, blocks = attach(shared.descriptor, writable=('result',))
+        np.testing.assert_array_equal(arrays['coords'], mesh.coords)
+        np.testing.assert_array_equal(arrays['conn'], mesh.conn)
+        assert(not arrays['conn'].flags.writeable)
+        arrays['result'][:] = 1.
+        np.testing.assert_array_equal(shared['result'], np.ones(3))
+        del arrays
+        for block in blocks:
+            block.close()
+        descriptor = shared.descriptor
+    with pytest.raises(FileNotFoundError):
+        attach(descriptor)
+
+
+def test_get_vert_blocks():
+    """Tests that the vertex blocks cover every vertex once and are balanced
+    """
+    tris_per_vert = np.array([5, 1, 1, 6, 0, 4, 2, 5])
+    bounds = parallel.get_vert_blocks(tris_per_vert, 3)
+    np.testing.assert_array_equal(bounds, [0, 3, 5, 8])
+    np.testing.assert_array_equal(parallel.get_vert_blocks([], 3), [0])
+
+
+def test_get_halos():
+    """Tests that the halo of each vertex block holds exactly the triangles
+    adjacent to at least one vertex of the block
+    """
+    mesh = random_mesh()
+    bounds = parallel.get_vert_blocks(mesh.get_tris_per_vert(), 4)
+    halos, halo_offsets = parallel.get_halos(mesh.get_vert_tri_adjacency(),
+                                             bounds)
+    assert(len(halo_offsets) == len(bounds))
+    for b, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+        exp = np.flatnonzero(((mesh.conn >= start) &
+                              (mesh.conn < stop)).any(axis=1))
+        np.testing.assert_array_equal(
+            halos[halo_offsets[b]:halo_offsets[b + 1]], exp)
+
+
+def test_compute_roughness_partitions():
+    """Tests that the partitioned gaussian curvature and roughness are
+    identical to the single process ones, including at the block seams
+    """
+    serial = random_mesh()
+    partitioned = random_mesh()
+    parallel.compute_roughness_partitions(partitioned, 3)
+    np.testing.assert_array_equal(partitioned._cache['gaussian_curvature'],
+                                  serial.get_gaussian_curvature())
+    np.testing.assert_array_equal(partitioned._cache['roughness'],
+                                  serial.get_roughness())
+    assert(not partitioned.is_cached('vert_tri_adjacency'))
+    assert(partitioned.get_average_roughness() ==
+           serial.get_average_roughness())
@@ -0,0 +1,134 @@
+import dagmc_stats.stats_output as so
+from dagmc_stats.StreamingSummary import StreamingSummary
+import numpy as np
+import io
+import json
+
+spv_data = np.zeros(3, dtype=[('volume', np.uint64), ('global_id', np.int32),
+                              ('surfaces', np.int64)])
+spv_data['volume'] = [12682136550675316737, 12682136550675316738,
+                      12682136550675316739]
+spv_data['global_id'] = [1, 2, 3]
+spv_data['surfaces'] = 6
+stats = {'T_A_R': {'minimum': 1.0, 'median': 1.5, 'p99': 2.5}}
+data = {'SPV_Entity': spv_data, 'T_A_R': np.array([1., 1.5, 2.5])}
+
+
+def write(output_format):
+    out = io.StringIO()
+    so.writers[output_format](out, so.get_stats_table(stats),
+                              so.get_entity_tables(data))
+    return out.getvalue()
+
+
+def test_write_json():
+    """Tests that the JSON output holds the statistics and the entity columns
+    """
+    obs = json.loads(write('json'))
+    assert(obs['stats'] == stats)
+    assert(obs['SPV_Entity']['volume'] == spv_data['volume'].tolist())
+    assert(obs['SPV_Entity']['global_id'] == [1, 2, 3])
+
+
+def test_write_jsonl_chunks():
+    """Tests that the JSON lines output is complete when the entity table is
+    written in several chunks
+    """
+    chunk_size = so.CHUNK_SIZE
+    so.CHUNK_SIZE = 2
+    try:
+        lines = [json.loads(line) for line in write('jsonl').splitlines()]
+    finally:
+        so.CHUNK_SIZE = chunk_size
+    assert(len(lines) == 6)
+    rows = [line for line in lines if line['table'] == 'SPV_Entity']
+    assert([row['global_id'] for row in rows] == [1, 2, 3])
+    assert(rows[0]['volume'] == 12682136550675316737)
+
+
+def test_write_csv():
+    """Tests the blocks of the CSV output
+    """
+    blocks = write('csv').split('\n\n')
+    assert(blocks[0].splitlines()[0] == 'name,key,value')
+    assert(blocks[0].splitlines()[2] == 'T_A_R,median,1.5')
+    assert(blocks[1].splitlines() == ['volume,global_id,surfaces',
+                                      '12682136550675316737,1,6',
+                                      '12682136550675316738,2,6',
+                                      '12682136550675316739,3,6'])
+
+
+def test_write_npz():
+    """Tests that the npz archive stores the tables as structured arrays
+    """
+    out = io.BytesIO()
+    so.write_npz(out, so.get_stats_table(stats), so.get_entity_tables(data))
+    out.seek(0)
+    archive = np.load(out)
+    np.testing.assert_array_equal(archive['SPV_Entity'], spv_data)
+    assert(archive['stats']['value'].tolist() == [1.0, 1.5, 2.5])
+
+
+def reject_constant(constant):
+    raise ValueError('non-standard JSON constant ' + constant)
+
+
+def test_write_empty_metric():
+    """Tests that the statistics of an empty dataset are written as null
+    and that the JSON and JSON lines outputs parse strictly
+    """
+    empty_stats = {'T_A_R': StreamingSummary().get_stats()}
+    stats_table = so.get_stats_table(empty_stats)
+    out = io.StringIO()
+    so.write_json(out, stats_table, {})
+    obs = json.loads(out.getvalue(), parse_constant=reject_constant)
+    assert(all(value is None for value in obs['stats']['T_A_R'].values()))
+    out = io.StringIO()
+    so.write_jsonl(out, stats_table, {})
+    lines = [json.loads(line, parse_constant=reject_constant)
+             for line in out.getvalue().splitlines()]
+    assert(len(lines) == len(empty_stats['T_A_R']))
+    assert(all(line['value'] is None for line in lines))
+
+
+def test_integer_stats():
+    """Tests that integer statistics are written as integers in the text
+    formats and as floats in the npz archive
+    """
+    int_stats = {'T_P_V': {'minimum': np.int64(3), 'mean': np.float64(4.5)},
+                 'S_P_V': {'maximum': 6}}
+    stats_table = so.get_stats_table(int_stats)
+    out = io.StringIO()
+    so.write_json(out, stats_table, {})
+    obs = json.loads(out.getvalue())['stats']
+    assert(type(obs['T_P_V']['minimum']) is int)
+    assert(obs == int_stats)
+    out = io.StringIO()
+    so.write_csv(out, stats_table, {})
+    assert(out.getvalue().splitlines() == ['name,key,value',
+                                           'T_P_V,minimum,3',
+                                           'T_P_V,mean,4.5',
+                                           'S_P_V,maximum,6'])
+    out = io.BytesIO()
+    so.write_npz(out, stats_table, {})
+    out.seek(0)
+    assert(np.load(out)['stats']['value'].tolist() == [3., 4.5, 6.])
+
+
+def test_write_with_filename():
+    """Tests that every JSON line and CSV row carries the file name when one
+    is given, including names that need quoting or escaping
+    """
+    filename = 'models/100%,"a".h5m'
+    out = io.StringIO()
+    so.write_jsonl(out, so.get_stats_table(stats), so.get_entity_tables(data),
+                   filename=filename)
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert(all(line['file'] == filename for line in lines))
+    out = io.StringIO()
+    so.write_csv(out, so.get_stats_table(stats), so.get_entity_tables(data),
+                 filename=filename)
+    blocks = out.getvalue().split('\n\n')
+    assert(blocks[1].splitlines()[0] == 'file,volume,global_id,surfaces')
+    assert(blocks[1].splitlines()[1] ==
+           '"models/100%,""a"".h5m",12682136550675316737,1,6')
@@ -0,0 +1,87 @@
+from dagmc_stats.StreamingSummary import StreamingSummary
+import numpy as np
+
+rng = np.random.default_rng(1)
+data = np.concatenate([rng.lognormal(0., 2., 20000),
+                       -rng.exponential(1., 500), np.zeros(100)])
+
+
+def test_exact_moments():
+    """Tests that the moments are exact when the data is fed in chunks
+    """
+    summary = StreamingSummary(chunk_size=1000)
+    summary.update(iter(data.tolist()))
+    assert(summary.count == len(data))
+    assert(summary.minimum == data.min())
+    assert(summary.maximum == data.max())
+    np.testing.assert_almost_equal(summary.mean, data.mean())
+    np.testing.assert_almost_equal(summary.variance / data.var(), 1.)
+
+
+def test_exact_mode():
+    """Tests that the exact mode matches np.percentile
+    """
+    summary = StreamingSummary(exact=True)
+    summary.update(data[:7000])
+    summary.update(data[7000:])
+    stats = summary.get_stats()
+    np.testing.assert_almost_equal(stats['median'], np.median(data))
+    for name, q in StreamingSummary.QUANTILES.items():
+        np.testing.assert_almost_equal(stats[name],
+                                       np.percentile(data, 100 * q))
+
+
+def test_sketch_accuracy():
+    """Tests that the sketch quantiles are within the relative accuracy of
+    the rank they estimate
+    """
+    summary = StreamingSummary(relative_accuracy=0.01)
+    summary.update(data)
+    sorted_data = np.sort(data)
+    for q in [0.01, 0.05, 0.25, 0.5, 0.95, 0.99]:
+        exp = sorted_data[int(q * (len(data) - 1))]
+        obs = summary.quantile(q)
+        assert(abs(obs - exp) <= 0.01 * abs(exp) + 1e-12)
+
+
+def test_merge():
+    """Tests that merging two summaries gives the summary of all the data
+    """
+    first = StreamingSummary()
+    first.update(data[:5000])
+    second = StreamingSummary()
+    second.update(data[5000:])
+    first.merge(second)
+    whole = StreamingSummary()
+    whole.update(data)
+    assert(first.count == whole.count)
+    np.testing.assert_almost_equal(first.variance, whole.variance)
+    for q in [0.01, 0.5, 0.99]:
+        assert(first.quantile(q) == whole.quantile(q))
+
+
+def test_integer_extrema():
+    """Tests that the minimum and maximum of integer data are integers, also
+    when the data is given as an iterable or merged from another summary
+    """
+    summary = StreamingSummary(exact=True)
+    summary.update(iter([2, 6, 6, 1]))
+    other = StreamingSummary(exact=True)
+    other.update(np.array([3, 9]))
+    summary.merge(other)
+    stats = summary.get_stats()
+    assert(type(stats['minimum']) is int and stats['minimum'] == 1)
+    assert(type(stats['maximum']) is int and stats['maximum'] == 9)
+    summary.update(np.array([0.5]))
+    assert(type(summary.get_stats()['minimum']) is not int)
+
+
+def test_empty_stats():
+    """Tests that all the statistics of a summary without values are NaN,
+    also after merging another empty summary
+    """
+    summary = StreamingSummary()
+    summary.update(np.zeros(0))
+    summary.merge(StreamingSummary())
+    stats = summary.get_stats()
+    assert(all(np.isnan(value) for value in stats.values()))
@@ -0,0 +1,97 @@
+from dagmc_stats.TriangleMesh import TriangleMesh
+from test_geometry import pyramid
+import numpy as np
+import pytest
+
+# the pyramid of the roughness tests, with the base and the lateral faces as
+# two surfaces
+coords, conn = pyramid()
+
+
+def test_surf_area():
+    """Tests the get_tris_per_surf and get_surf_area functions
+    """
+    mesh = TriangleMesh(coords, conn, surf_offsets=[0, 2, 6])
+    np.testing.assert_array_equal(mesh.get_tris_per_surf(), [2, 4])
+    np.testing.assert_almost_equal(mesh.get_surf_area(),
+                                   [25., 4 * 25 * np.sqrt(3) / 4])
+
+
+def test_tri_roughness():
+    """Tests that get_tri_roughness averages the vertex roughness values of
+    each triangle
+    """
+    mesh = TriangleMesh(coords, conn)
+    lri = mesh.get_roughness()
+    exp = [lri[tri].mean() for tri in conn]
+    np.testing.assert_almost_equal(mesh.get_tri_roughness(), exp)
+
+
+def test_average_roughness():
+    """Tests that get_average_roughness weights each vertex by one third of
+    the area of its adjacent triangles
+    """
+    mesh = TriangleMesh(coords, conn)
+    lri = mesh.get_roughness()
+    tri_area = mesh.get_tri_geometry()['area']
+    si = [tri_area[(conn == v).any(axis=1)].sum() / 3 for v in range(5)]
+    exp = np.dot(lri, si) / tri_area.sum()
+    np.testing.assert_almost_equal(mesh.get_average_roughness(), exp)
+
+
+def test_release():
+    """Tests that a released intermediate is computed again when needed
+    """
+    mesh = TriangleMesh(coords, conn)
+    lri = mesh.get_roughness()
+    assert(TriangleMesh.get_dependencies(['roughness']) ==
+           set(mesh._cache.keys()))
+    assert(mesh.is_cached('roughness'))
+    mesh.release('roughness')
+    assert(not mesh.is_cached('roughness'))
+    np.testing.assert_almost_equal(mesh.get_roughness(), lri)
+
+
+def test_threads():
+    """Tests that a mesh of many pyramid copies gets the same metrics with
+    its kernels split across threads
+    """
+    num_copies = 3000
+    offsets = 10. * np.arange(num_copies)
+    many_coords = (coords[np.newaxis, :, :] +
+                   offsets[:, np.newaxis, np.newaxis]).reshape(-1, 3)
+    many_conn = (conn[np.newaxis, :, :] +
+                 len(coords) * np.arange(num_copies)[:, np.newaxis,
+                                                     np.newaxis]).reshape(-1, 3)
+    serial = TriangleMesh(many_coords, many_conn)
+    threaded = TriangleMesh(many_coords, many_conn, threads=3)
+    np.testing.assert_array_equal(threaded.get_tri_geometry()['area'],
+                                  serial.get_tri_geometry()['area'])
+    np.testing.assert_array_equal(threaded.get_tris_per_vert(),
+                                  serial.get_tris_per_vert())
+    np.testing.assert_allclose(threaded.get_roughness(),
+                               serial.get_roughness())
+    np.testing.assert_allclose(threaded.get_vert_area(),
+                               serial.get_vert_area())
+
+
+def test_from_moab_missing_verts():
+    """Tests that the triangle vertices that are missing from the given
+    vertices, as in surface sets that hold only triangles, are added
+    """
+    core = pytest.importorskip('pymoab.core')
+    types = pytest.importorskip('pymoab.types')
+    my_core = core.Core()
+    verts = my_core.create_vertices(np.array([0., 0., 0., 1., 0., 0.,
+                                              0., 1., 0., 1., 1., 0.]))
+    vert_handles = np.array(list(verts), dtype=np.uint64)
+    tris = [my_core.create_element(types.MBTRI, vert_handles[[0, 1, 2]]),
+            my_core.create_element(types.MBTRI, vert_handles[[1, 3, 2]])]
+    mesh = TriangleMesh.from_moab(my_core, np.array(tris, dtype=np.uint64),
+                                  verts=vert_handles[:2])
+    np.testing.assert_array_equal(mesh.vert_handles, vert_handles)
+    np.testing.assert_array_equal(mesh.vert_handles[mesh.conn],
+                                  [vert_handles[[0, 1, 2]],
+                                   vert_handles[[1, 3, 2]]])
+    np.testing.assert_almost_equal(mesh.get_tri_geometry()['area'],
+                                   [0.5, 0.5])